@@ -0,0 +1,663 @@
+"""
+Benchmark Script
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import ChessEngine
+import ChessOrdering
+import ChessParallel
+import ChessPerft
+import ChessPGN
+import ChessPresence
+import ChessSearch
+import ChessTransposition
+
+
+def run_moves(args):
+    gs = ChessEngine.GameState()
+    # Walk a fixed random game so the measurement covers middlegame positions as well as the opening.
+    rng = random.Random(args.seed)
+    positions = []
+    for _ in range(args.plies):
+        moves = gs.get_valid_moves()
+        if not moves:
+            break
+        positions.append([move.code for move in moves])
+        gs.make_move(rng.choice(moves))
+    while gs.moveLog:
+        gs.undo_move()
+
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    kept = [gs.get_valid_moves() for _ in range(args.repeat)]
+    allocated = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    count = sum(len(moves) for moves in kept)
+    print(f"Memory: {allocated / count:.1f} bytes per generated move (including its list slot)")
+    del kept
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for codes in positions:
+            for code in codes:
+                ChessEngine.Move.from_code(code)
+    elapsed = time.perf_counter() - start
+    created = args.repeat * sum(len(codes) for codes in positions)
+    print(f"Construction: {created / elapsed:.0f} moves/s")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        gs.get_valid_moves()
+    elapsed = time.perf_counter() - start
+    print(f"get_valid_moves: {elapsed / args.repeat * 1e6:.1f} us per call from the start position")
+    return 0
+
+
+def run_make_undo(args):
+    for name, fen, _ in ChessPerft.POSITIONS:
+        gs = ChessEngine.GameState.from_fen(fen)
+        moves = ChessPerft.legal_moves(gs)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for move in moves:
+                gs.make_move(move)
+                gs.undo_move()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<20} {elapsed / (args.repeat * len(moves)) * 1e6:6.2f} us per make_move + undo_move")
+    return 0
+
+
+def run_tables(args):
+    builders = [
+        ("ChessEngine target tables", lambda: (ChessEngine._build_target_table(ChessEngine.KNIGHT_STEPS),
+                                              ChessEngine._build_target_table(ChessEngine.KING_STEPS),
+                                              ChessEngine._build_target_table(((-1, -1), (-1, 1))),
+                                              ChessEngine._build_target_table(((1, -1), (1, 1))))),
+        ("ChessEngine RAY_TARGETS", ChessEngine._build_ray_table),
+    ]
+    for name, build in builders:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            build()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<30} {elapsed / args.repeat * 1e3:7.3f} ms")
+
+    # A fresh interpreter gives the real cost of importing the engine, tables included.
+    output = subprocess.run(
+        [sys.executable, '-c', "import time; start = time.perf_counter(); import ChessEngine; "
+                               "print(time.perf_counter() - start)"],
+        capture_output=True, text=True, check=True).stdout
+    print(f"import {'ChessEngine':<22} {float(output) * 1e3:7.3f} ms")
+    return 0
+
+
+def run_fen(args):
+    if args.file:
+        with open(args.file) as file:
+            fens = [line.strip() for line in file if line.strip()]
+    else:
+        # Positions from random games, so that the batch has the variety of a real one.
+        rng = random.Random(args.seed)
+        fens = []
+        while len(fens) < args.positions:
+            gs = ChessEngine.GameState()
+            for _ in range(args.plies):
+                moves = gs.get_valid_moves()
+                if not moves or len(fens) >= args.positions:
+                    break
+                gs.make_move(rng.choice(moves))
+                fens.append(gs.to_fen())
+
+    mismatches = sum(1 for fen in fens if ChessEngine.GameState.from_fen(fen).to_fen() != ' '.join(fen.split()))
+    print(f"{len(fens)} positions, {mismatches} changed by a from_fen/to_fen round trip")
+
+    def parse_all():
+        for fen in fens:
+            ChessEngine.parse_fen(fen)
+
+    def load_all():
+        for fen in fens:
+            ChessEngine.GameState.from_fen(fen)
+
+    # The results are not kept, as in a batch job that streams positions; keeping a GameState per position would
+    # measure the garbage collector and the memory use instead.
+    states = [ChessEngine.GameState.from_fen(fen) for fen in fens[:10000]]
+    for name, run, count in (("parse_fen", parse_all, len(fens)), ("GameState.from_fen", load_all, len(fens)),
+                             ("GameState.to_fen", lambda: [gs.to_fen() for gs in states], len(states))):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<20} {count / elapsed:9.0f} positions/s  {elapsed / count * 1e6:6.2f} us per position")
+    return 1 if mismatches else 0
+
+
+def run_pgn(args):
+    path = args.file
+    if path is None:
+        rng = random.Random(args.seed)
+        games = []
+        for _ in range(args.games):
+            gs = ChessEngine.GameState()
+            for _ in range(args.plies):
+                moves = gs.get_valid_moves()
+                if not moves:
+                    break
+                gs.make_move(rng.choice(moves))
+            gs.get_valid_moves()
+            games.append((gs.moveLog, ChessPGN.game_result(gs)))
+        handle, path = tempfile.mkstemp(suffix='.pgn')
+        start = time.perf_counter()
+        with os.fdopen(handle, 'w') as file:
+            ChessPGN.write_games(file, (ChessPGN.PGNGame({}, ChessPGN.moves_to_san(moves), result)
+                                        for moves, result in games))
+        elapsed = time.perf_counter() - start
+        print(f"{'write (with SAN)':<18} {args.games / elapsed:8.1f} games/s")
+
+    try:
+        for name, replay in (("read", False), ("read and replay", True)):
+            count = errors = 0
+            start = time.perf_counter()
+            with open(path) as file:
+                for game in ChessPGN.read_games(file):
+                    count += 1
+                    if replay:
+                        try:
+                            ChessPGN.replay_game(game)
+                        except ValueError as e:
+                            errors += 1
+                            print(f"Game {count}: {e}")
+            elapsed = time.perf_counter() - start
+            print(f"{name:<18} {count / elapsed:8.1f} games/s  {count} games")
+    finally:
+        if args.file is None:
+            os.remove(path)
+    return 1 if errors else 0
+
+
+def run_search(args):
+    totalNodes = 0
+    totalTime = 0
+    tt = ChessTransposition.TranspositionTable(args.hash)
+    for name, fen, _ in ChessPerft.POSITIONS:
+        tt.clear()
+        result = ChessSearch.search(ChessEngine.GameState.from_fen(fen), args.time, args.depth, tt=tt)
+        totalNodes += result.nodes
+        totalTime += result.timeMs
+        notation = result.move.get_chess_notation() + result.move.promotionPiece.lower()
+        stats = tt.stats()
+        print(f"{name:<20} depth {result.depth}: {notation:<5} score {result.score:>6} "
+              f"{result.nodes:>8} nodes {result.timeMs:>6} ms {result.nps:>7} nodes/s  "
+              f"tt hits {stats['hitRate']:.0%} collisions {stats['collisions']}")
+    print(f"Total: {totalNodes} nodes in {totalTime} ms ({totalNodes * 1000 // max(totalTime, 1)} nodes/s)")
+    return 0
+
+
+def run_ordering(args):
+    configurations = [
+        ("hash move only", dict(useCaptures=False, useKillers=False, useHistory=False)),
+        ("+ MVV-LVA", dict(useCaptures=True, useKillers=False, useHistory=False)),
+        ("+ killers", dict(useCaptures=True, useKillers=True, useHistory=False)),
+        ("+ history", dict(useCaptures=True, useKillers=True, useHistory=True)),
+    ]
+    tt = ChessTransposition.TranspositionTable(args.hash)
+    for name, options in configurations:
+        nodes = 0
+        cutoffs = 0
+        firstMoveCutoffs = 0
+        start = time.perf_counter()
+        for _, fen, _ in ChessPerft.POSITIONS:
+            tt.clear()
+            orderer = ChessOrdering.MoveOrderer(**options)
+            nodes += ChessSearch.search(ChessEngine.GameState.from_fen(fen), 10 ** 9, args.depth, tt=tt,
+                                        orderer=orderer).nodes
+            cutoffs += orderer.cutoffs
+            firstMoveCutoffs += orderer.firstMoveCutoffs
+        elapsed = time.perf_counter() - start
+        print(f"{name:<16} {nodes:>9} nodes to depth {args.depth} {elapsed:7.2f}s  "
+              f"first move cutoffs {firstMoveCutoffs / max(cutoffs, 1):.1%} of {cutoffs}")
+    return 0
+
+
+def run_parallel(args):
+    maxWorkers = args.workers if args.workers is not None else multiprocessing.cpu_count()
+    print(f"{multiprocessing.cpu_count()} CPU cores")
+    baseline = None
+    for workers in range(1, maxWorkers + 1):
+        with ChessParallel.ParallelSearcher(workers, args.hash) as searcher:
+            if searcher.workers != workers:
+                break
+            nodes = 0
+            start = time.perf_counter()
+            for _, fen, _ in ChessPerft.POSITIONS:
+                searcher.clear()
+                nodes += searcher.search(ChessEngine.GameState.from_fen(fen), 10 ** 9, args.depth).nodes
+            elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>2} workers: depth {args.depth} in {elapsed:7.2f}s  {nodes:>9} nodes  "
+              f"{nodes / elapsed:8.0f} nodes/s  speedup {baseline / elapsed:.2f}x")
+    return 0
+
+
+# Run in a fresh interpreter: imports ChessMain and draws the first frame of the game window, as main() does after the
+# menu, then prints the import time and the time to the first frame.
+FIRST_FRAME_SCRIPT = """
+import time
+start = time.perf_counter()
+import ChessMain
+imported = time.perf_counter()
+ChessMain.load_pygame()
+ChessMain.COLORS = [ChessMain.p.Color(*color) for color in ChessMain.THEME_COLORS['Default']]
+screen, clock = ChessMain.open_window()
+gs = ChessMain.ChessEngine.GameState()
+moveLog = ChessMain.MoveLogView(ChessMain.p.font.SysFont('Arial', 25, False, False))
+moveLog.sync(gs.moveLog)
+ChessMain.p.display.update(ChessMain.BoardRenderer(screen, moveLog).draw(gs, gs.get_valid_moves(), ()))
+print(imported - start, time.perf_counter() - start, flush=True)
+"""
+
+
+# Modules ChessMain imports when first needed rather than with the module.
+DEFERRED_IMPORTS = ('pygame', 'tkinter', 'json', 'ChessBook', 'ChessPGN', 'ChessSearch', 'ChessTablebase',
+                    'ChessParallel')
+
+
+def run_startup(args):
+    env = dict(os.environ)
+    if args.headless:
+        env['SDL_VIDEODRIVER'] = 'dummy'
+    env['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'
+
+    # Import cost of each module imported by ChessMain, from python -X importtime (cumulative microseconds).
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ChessMain'], env=env,
+                            capture_output=True, text=True, check=True).stderr
+    # A module is listed after the modules it imports, indented by two more spaces.
+    imports = []
+    for line in stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = len(name) - len(name.lstrip())
+        if depth == 1:
+            if name.strip() == 'ChessMain':
+                imports.append((int(fields[1]), 'ChessMain'))
+                break
+            imports = []
+        elif depth == 3:
+            imports.append((int(fields[1]), name.strip()))
+    print("Modules imported by 'import ChessMain' (python -X importtime, cumulative):")
+    for cumulative, name in sorted(imports, reverse=True)[:args.top]:
+        print(f"  {name:<30} {cumulative / 1000:8.2f} ms")
+    # Each timed alone in a fresh interpreter, so shared dependencies such as ChessEngine are counted in each.
+    for module in DEFERRED_IMPORTS:
+        stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], env=env,
+                                capture_output=True, text=True).stderr
+        cost = [int(line.split('|')[1]) for line in stderr.splitlines() if line.split('|')[-1].strip() == module]
+        if cost:
+            print(f"  {module + ' (deferred)':<30} {cost[0] / 1000:8.2f} ms")
+
+    # Time to the first frame of the game window, from the start of the process.
+    firstFrames = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        # pygame warns on every start when it cannot list the system fonts.
+        process = subprocess.Popen([sys.executable, '-W', 'ignore::UserWarning', '-c', FIRST_FRAME_SCRIPT], env=env,
+                                   stdout=subprocess.PIPE, text=True)
+        line = process.stdout.readline()
+        firstFrame = time.perf_counter() - start
+        process.wait()
+        if process.returncode or not line:
+            print("The first frame could not be drawn; try --headless without a display")
+            return 1
+        importTime, inProcess = map(float, line.split())
+        firstFrames.append((firstFrame, importTime, inProcess))
+    firstFrame, importTime, inProcess = min(firstFrames)
+    print(f"import ChessMain {importTime * 1e3:8.2f} ms")
+    print(f"First frame      {inProcess * 1e3:8.2f} ms after the interpreter started, {firstFrame * 1e3:8.2f} ms "
+          f"after the process was launched (best of {args.repeat}; the menu window is not included)")
+    return 0
+
+
+class LocalIPCClient:
+    """
+    A stand-in for the Rich Presence client: each update is a request over a local socket, answered by a server thread
+    after a delay, like the round trip to the Discord app.
+    """
+
+    def __init__(self, latency):
+        self.socket, server = socket.socketpair()
+        threading.Thread(target=self._serve, args=(server, latency), daemon=True).start()
+
+    @staticmethod
+    def _serve(server, latency):
+        with server:
+            while server.recv(65536):
+                time.sleep(latency)
+                server.sendall(b'{"evt": null}')
+
+    def update(self, **state):
+        self.socket.sendall(json.dumps(state).encode())
+        if not self.socket.recv(65536):
+            raise ConnectionError("Connection closed")
+
+    def drop(self):
+        # Simulates Discord closing: the next update fails.
+        self.socket.shutdown(socket.SHUT_RDWR)
+
+    def close(self):
+        self.socket.close()
+
+
+def run_presence(args):
+    latency = args.latency / 1000
+
+    def presence(i):
+        return {'details': "Playing Good Chess", 'state': f"Moves: {i}", 'large_image': "icon"}
+
+    # Every event making the call itself, as the game loop did before the worker.
+    client = LocalIPCClient(latency)
+    blocked = 0.0
+    for i in range(args.events):
+        start = time.perf_counter()
+        client.update(**presence(i))
+        blocked += time.perf_counter() - start
+        time.sleep(args.pace / 1000)
+    client.close()
+    print(f"Synchronous: {blocked / args.events * 1e3:8.3f} ms per event in the game loop, {args.events} IPC calls")
+
+    # The same events through the worker, with the connection dropped halfway.
+    clients = []
+
+    def connect():
+        clients.append(LocalIPCClient(latency))
+        return clients[-1]
+
+    interval = args.interval / 1000
+    worker = ChessPresence.PresenceWorker(connect, interval, reconnectInterval=interval).start()
+    blocked = 0.0
+    for i in range(args.events):
+        start = time.perf_counter()
+        worker.update(**presence(i))
+        blocked += time.perf_counter() - start
+        if i == args.events // 2 and clients:
+            clients[-1].drop()
+        time.sleep(args.pace / 1000)
+    worker.close()
+    print(f"Worker:      {blocked / args.events * 1e3:8.3f} ms per event in the game loop, {worker.sent} IPC calls "
+          f"({worker.coalesced} updates coalesced, {worker.failures} failures, {len(clients) - 1} reconnections)")
+    return 0
+
+
+def open_headless_window():
+    """
+    Open the game window under SDL's dummy video driver, which draws in memory, so that the drawing benchmarks run
+    without a display.
+
+    Returns:
+    A tuple (ChessMain, screen, moveLogFont).
+    """
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    import ChessMain
+    ChessMain.load_pygame()
+    ChessMain.COLORS = [ChessMain.p.Color(*color) for color in ChessMain.THEME_COLORS['Default']]
+    screen, _ = ChessMain.open_window()
+    return ChessMain, screen, ChessMain.p.font.SysFont("Arial", 25, False, False)
+
+
+def draw_full_frame(ChessMain, screen, gs, validMoves=(), sqSelected=(), moveLog=None):
+    """
+    Draw the board, highlights, every piece and the move log from scratch, as the game did on every frame before
+    BoardRenderer. The baseline of the render and animation benchmarks.
+    """
+
+    p, sqSize = ChessMain.p, ChessMain.SQ_SIZE
+    screen.blit(ChessMain.board_surface(), (0, 0))
+    for (r, c), color in ChessMain.square_highlights(gs, validMoves, sqSelected).items():
+        screen.blit(ChessMain.highlight_surface(color), (c * sqSize, r * sqSize))
+    for r, row in enumerate(gs.board):
+        for c, piece in enumerate(row):
+            if piece != '--':
+                screen.blit(ChessMain.IMAGES[piece], p.Rect(c * sqSize, r * sqSize, sqSize, sqSize))
+    if moveLog is not None:
+        moveLog.draw(screen)
+
+
+def run_render(args):
+    ChessMain, screen, font = open_headless_window()
+    p = ChessMain.p
+
+    rng = random.Random(args.seed)
+    gs = ChessEngine.GameState()
+    for _ in range(args.plies):
+        moves = gs.get_valid_moves()
+        if not moves:
+            break
+        gs.make_move(rng.choice(moves))
+    validMoves = gs.get_valid_moves()
+    # Two pieces to select in turn, for the frames where something changes.
+    starts = list(dict.fromkeys((move.startRow, move.startCol) for move in validMoves))[:2] or [()]
+    selections = [starts[0], starts[-1]]
+    moveLog = ChessMain.MoveLogView(font)
+    moveLog.sync(gs.moveLog)
+    renderer = ChessMain.BoardRenderer(screen, moveLog)
+
+    def full_redraw(sqSelected):
+        draw_full_frame(ChessMain, screen, gs, validMoves, sqSelected, moveLog)
+        p.display.flip()
+
+    def dirty_rectangles(sqSelected):
+        dirty = renderer.draw(gs, validMoves, sqSelected)
+        if dirty:
+            p.display.update(dirty)
+
+    print(f"{len(gs.moveLog)} plies played, {args.frames} frames each, SDL video driver {p.display.get_driver()}")
+    for name, frame in (("Full redraw + flip", full_redraw), ("Dirty rectangles", dirty_rectangles)):
+        for label, changing in (("idle", False), ("new selection", True)):
+            frame(selections[0])
+            wall, cpu = time.perf_counter(), time.process_time()
+            for i in range(args.frames):
+                frame(selections[i & 1] if changing else selections[0])
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            print(f"{name:<20} {label:<14} {wall / args.frames * 1e3:8.3f} ms per frame, "
+                  f"{cpu / args.frames * 1e3:8.3f} ms CPU")
+    return 0
+
+
+def run_move_log(args):
+    ChessMain, screen, font = open_headless_window()
+    p = ChessMain.p
+
+    # Moves of random games, one after the other until there are enough: the panel only needs their notation.
+    rng = random.Random(args.seed)
+    moves = []
+    while len(moves) < args.plies:
+        gs = ChessEngine.GameState()
+        validMoves = gs.get_valid_moves()
+        while validMoves and len(moves) < args.plies:
+            gs.make_move(rng.choice(validMoves))
+            moves.append(gs.moveLog[-1])
+            validMoves = gs.get_valid_moves()
+
+    def draw_every_move(moveLog):
+        # The panel as it was drawn before MoveLogView: every move rendered and drawn on every frame.
+        panel = p.Rect(ChessMain.BOARD_WIDTH, 0, ChessMain.MOVE_LOG_PANEL_WIDTH, ChessMain.MOVE_LOG_PANEL_HEIGHT)
+        p.draw.rect(screen, p.Color('black'), panel)
+        textY = 5
+        for i, move in enumerate(moveLog):
+            textObject = font.render(f"{i + 1}. {move.get_chess_notation()}", True, p.Color('white'))
+            screen.blit(textObject, panel.move(5, textY))
+            textY += textObject.get_height() + 2
+
+    print(f"{args.frames} frames per length, drawing the move log panel only")
+    print(f"{'plies':>6} {'every move':>12} {'MoveLogView':>12} {'sync per move':>14}")
+    for plies in sorted({max(args.plies * i // 4, 1) for i in range(1, 5)}):
+        moveLog = moves[:plies]
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            draw_every_move(moveLog)
+        everyMove = (time.perf_counter() - start) / args.frames
+
+        # The moves are synced one at a time, as the game loop does.
+        view = ChessMain.MoveLogView(font)
+        start = time.perf_counter()
+        for ply in range(1, plies + 1):
+            view.sync(moveLog[:ply])
+        sync = (time.perf_counter() - start) / plies
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            view.sync(moveLog)
+            view.draw(screen)
+        cached = (time.perf_counter() - start) / args.frames
+        print(f"{plies:>6} {everyMove * 1e3:9.3f} ms {cached * 1e3:9.3f} ms {sync * 1e3:11.3f} ms")
+    return 0
+
+
+def run_animation(args):
+    ChessMain, screen, font = open_headless_window()
+    p = ChessMain.p
+    # A Bishop crossing the whole board, the longest slide there is.
+    gs = ChessEngine.GameState(fen='k7/8/8/8/8/8/8/B6K w - - 0 1')
+    move = next(move for move in gs.get_valid_moves() if (move.startRow, move.endRow, move.endCol) == (7, 0, 7))
+    gs.make_move(move)
+    validMoves = gs.get_valid_moves()
+    moveLog = ChessMain.MoveLogView(font)
+    moveLog.sync(gs.moveLog)
+    squares = abs(move.endRow - move.startRow) + abs(move.endCol - move.startCol)
+
+    # As animate_move drew each frame before BoardRenderer: the whole board and every piece, then the whole window.
+    frameCount = squares * ChessMain.FRAMES_PER_SQUARE
+    start, cpu = time.perf_counter(), time.process_time()
+    for frame in range(frameCount + 1):
+        r = move.startRow + (move.endRow - move.startRow) * frame / frameCount
+        c = move.startCol + (move.endCol - move.startCol) * frame / frameCount
+        draw_full_frame(ChessMain, screen, gs)
+        endSquare = p.Rect(move.endCol * ChessMain.SQ_SIZE, move.endRow * ChessMain.SQ_SIZE, ChessMain.SQ_SIZE,
+                           ChessMain.SQ_SIZE)
+        p.draw.rect(screen, ChessMain.COLORS[(move.endRow + move.endCol) % 2], endSquare)
+        screen.blit(ChessMain.IMAGES[move.pieceMoved], (c * ChessMain.SQ_SIZE, r * ChessMain.SQ_SIZE))
+        p.display.flip()
+    fullWall, fullCpu = time.perf_counter() - start, time.process_time() - cpu
+    print(f"{squares} squares, {ChessMain.FRAMES_PER_SQUARE} frames per square, SDL video driver "
+          f"{p.display.get_driver()}")
+    print(f"Full redraw       {frameCount + 1:>6} frames {fullWall / (frameCount + 1) * 1e3:8.3f} ms per frame, "
+          f"{fullCpu / (frameCount + 1) * 1e3:8.3f} ms CPU")
+
+    # BoardRenderer, drawing as many frames as it can in the time the slide lasts.
+    renderer = ChessMain.BoardRenderer(screen, moveLog)
+    renderer.draw(gs, validMoves, ())
+    renderer.animate(move)
+    frames = pixels = 0
+    start, cpu = time.perf_counter(), time.process_time()
+    while renderer.animation is not None:
+        dirty = renderer.draw(gs, validMoves, ())
+        p.display.update(dirty)
+        frames += 1
+        pixels += sum(rect.width * rect.height for rect in dirty)
+    wall, cpu = time.perf_counter() - start, time.process_time() - cpu
+    print(f"Dirty rectangles  {frames:>6} frames {wall / frames * 1e3:8.3f} ms per frame, "
+          f"{cpu / frames * 1e3:8.3f} ms CPU, {pixels / frames / screen.get_width() / screen.get_height():.1%} of "
+          f"the window sent per frame, slide took {wall:.2f}s (expected {renderer.animationDuration / 1e3:.2f}s)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Good Chess engine benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    moves = subparsers.add_parser('moves', help="measure Move memory use and construction speed")
+    moves.add_argument('--repeat', type=int, default=1000)
+    moves.add_argument('--plies', type=int, default=60)
+    moves.add_argument('--seed', type=int, default=0)
+    moves.set_defaults(func=run_moves)
+
+    makeUndo = subparsers.add_parser('makeundo', help="time make_move/undo_move pairs on the perft positions")
+    makeUndo.add_argument('--repeat', type=int, default=2000)
+    makeUndo.set_defaults(func=run_make_undo)
+
+    tables = subparsers.add_parser('tables', help="time building the precomputed move tables and importing the engine")
+    tables.add_argument('--repeat', type=int, default=20)
+    tables.set_defaults(func=run_tables)
+
+    fen = subparsers.add_parser('fen', help="measure FEN parsing and writing throughput")
+    fen.add_argument('--positions', type=int, default=100000, help="number of positions from random games")
+    fen.add_argument('--plies', type=int, default=120)
+    fen.add_argument('--seed', type=int, default=0)
+    fen.add_argument('--file', help="read the positions from a file with one FEN per line instead")
+    fen.set_defaults(func=run_fen)
+
+    pgn = subparsers.add_parser('pgn', help="measure PGN writing, reading and replay throughput")
+    pgn.add_argument('--games', type=int, default=200, help="number of random games to write and read back")
+    pgn.add_argument('--plies', type=int, default=160)
+    pgn.add_argument('--seed', type=int, default=0)
+    pgn.add_argument('--file', help="read and replay the games of a PGN file instead")
+    pgn.set_defaults(func=run_pgn)
+
+    search = subparsers.add_parser('search', help="time the alpha-beta search on the perft positions")
+    search.add_argument('--depth', type=int, default=3)
+    search.add_argument('--time', type=int, default=60000, help="time budget per position in milliseconds")
+    search.add_argument('--hash', type=int, default=16, help="transposition table size in MB")
+    search.set_defaults(func=run_search)
+
+    ordering = subparsers.add_parser('ordering', help="compare the move ordering heuristics on the perft positions")
+    ordering.add_argument('--depth', type=int, default=3)
+    ordering.add_argument('--hash', type=int, default=16, help="transposition table size in MB")
+    ordering.set_defaults(func=run_ordering)
+
+    parallel = subparsers.add_parser('parallel', help="time to depth of the parallel search for 1 to N workers")
+    parallel.add_argument('--depth', type=int, default=4)
+    parallel.add_argument('--workers', type=int, default=None, help="most workers to try, by default the core count")
+    parallel.add_argument('--hash', type=int, default=16, help="transposition table size in MB")
+    parallel.set_defaults(func=run_parallel)
+
+    startup = subparsers.add_parser('startup',
+                                    help="measure the import cost of ChessMain and the time to the first frame")
+    startup.add_argument('--repeat', type=int, default=5)
+    startup.add_argument('--top', type=int, default=15, help="number of modules to list")
+    startup.add_argument('--headless', action='store_true', help="draw with SDL's dummy video driver")
+    startup.set_defaults(func=run_startup)
+
+    presence = subparsers.add_parser('presence', help="time Discord presence updates in the game loop, synchronous "
+                                                      "and through the worker, against a local stand-in")
+    presence.add_argument('--events', type=int, default=500, help="number of events that update the presence")
+    presence.add_argument('--latency', type=float, default=2.0, help="round trip of each update in milliseconds")
+    presence.add_argument('--pace', type=float, default=5.0, help="milliseconds between events")
+    presence.add_argument('--interval', type=float, default=100.0,
+                          help="least milliseconds between updates sent by the worker (Discord's limit is "
+                               f"{ChessPresence.UPDATE_INTERVAL * 1000:.0f})")
+    presence.set_defaults(func=run_presence)
+
+    render = subparsers.add_parser('render', help="time drawing the game window, under SDL's dummy video driver")
+    render.add_argument('--frames', type=int, default=500)
+    render.add_argument('--plies', type=int, default=20, help="plies of a random game to play before drawing")
+    render.add_argument('--seed', type=int, default=0)
+    render.set_defaults(func=run_render)
+
+    moveLog = subparsers.add_parser('movelog', help="time drawing the move log panel as the game gets longer")
+    moveLog.add_argument('--plies', type=int, default=500)
+    moveLog.add_argument('--frames', type=int, default=200)
+    moveLog.add_argument('--seed', type=int, default=0)
+    moveLog.set_defaults(func=run_move_log)
+
+    animation = subparsers.add_parser('animation', help="time the frames of a move's slide across the board")
+    animation.set_defaults(func=run_animation)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
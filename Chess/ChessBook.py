@@ -0,0 +1,224 @@
+"""
+Opening Book Script
+"""
+
+import argparse
+import mmap
+import random
+import struct
+import sys
+import time
+
+import ChessEngine
+import ChessPGN
+
+# A book file is MAGIC followed by RECORD entries (position hash, move code, weight, count), sorted by hash and, for
+# each position, by decreasing weight. Big-endian, so that the records sort the same as their bytes.
+MAGIC = b'GCBOOK01'
+RECORD = struct.Struct('>QIII')
+_KEY = struct.Struct('>Q')
+# Points a move earns for each game result, from the point of view of the player making it: 2 for a win, 1 for a draw
+# or an unfinished game, 0 for a loss.
+RESULT_POINTS = {'1-0': (2, 0), '0-1': (0, 2), '1/2-1/2': (1, 1), '*': (1, 1)}
+DEFAULT_BOOK_PLIES = 20
+
+
+def build_book(games, path, maxPlies=DEFAULT_BOOK_PLIES, minCount=1):
+    """
+    Build a book file from games.
+
+    Args:
+    - games: An iterable of ChessPGN.PGNGame, e.g. from ChessPGN.read_games.
+    - path: The book file to write.
+    - maxPlies: Number of plies of each game to add.
+    - minCount: Moves played fewer times than this are left out.
+
+    Returns:
+    A tuple (games, skipped, records): the number of games added, the number skipped because they could not be
+    replayed, and the number of records written.
+    """
+
+    entries = {}
+    added = skipped = 0
+    for game in games:
+        whitePoints, blackPoints = RESULT_POINTS.get(game.result, (1, 1))
+        gameEntries = []
+        try:
+            gs = ChessEngine.GameState(fen=game.headers.get('FEN', ChessEngine.START_FEN))
+            validMoves = gs.get_valid_moves()
+            for san in game.moves[:maxPlies]:
+                key = gs.hash
+                points = whitePoints if gs.whiteToMove else blackPoints
+                gs.make_move(ChessPGN.parse_san(gs, san, validMoves))
+                # The logged move carries the promotion piece chosen.
+                gameEntries.append((key, gs.moveLog[-1].code, points))
+                validMoves = gs.get_valid_moves()
+        except Exception:
+            # A malformed record must not stop the build; the game is skipped and counted instead.
+            skipped += 1
+            continue
+        for key, code, points in gameEntries:
+            entry = entries.setdefault((key, code), [0, 0])
+            entry[0] += points
+            entry[1] += 1
+        added += 1
+
+    records = sorted(((key, code, weight, count) for (key, code), (weight, count) in entries.items()
+                      if count >= minCount), key=lambda record: (record[0], -record[2], -record[3]))
+    with open(path, 'wb') as file:
+        file.write(MAGIC)
+        for key, code, weight, count in records:
+            file.write(RECORD.pack(key, code, min(weight, 0xFFFFFFFF), min(count, 0xFFFFFFFF)))
+    return added, skipped, len(records)
+
+
+class OpeningBook:
+    """
+    A book file, memory-mapped and searched by position hash.
+
+    Attributes:
+    - path: The book file.
+    - size: Number of records.
+
+    Opening the book only maps the file: nothing is read until a position is looked up, and then only the pages
+    the binary search touches.
+    """
+
+    def __init__(self, path):
+        """
+        Open a book file.
+
+        Args:
+        - path: The book file, as written by build_book.
+
+        Raises:
+        ValueError if the file is not a book file.
+        """
+
+        self.path = path
+        with open(path, 'rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC or (len(self.data) - len(MAGIC)) % RECORD.size:
+            self.data.close()
+            raise ValueError(f"Not an opening book file: {path}")
+        self.size = (len(self.data) - len(MAGIC)) // RECORD.size
+
+    def _key(self, index):
+        return _KEY.unpack_from(self.data, len(MAGIC) + index * RECORD.size)[0]
+
+    def entries(self, key):
+        """
+        Get the records of a position.
+
+        Args:
+        - key: The Zobrist hash of the position.
+
+        Returns:
+        A list of (moveCode, weight, count) tuples, highest weight first.
+        """
+
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        while low < self.size and self._key(low) == key:
+            entries.append(RECORD.unpack_from(self.data, len(MAGIC) + low * RECORD.size)[1:])
+            low += 1
+        return entries
+
+    def get_moves(self, gs):
+        """
+        Get the book moves of a position.
+
+        Args:
+        - gs: The game state.
+
+        Returns:
+        A list of (move, weight, count) tuples, highest weight first. Only valid moves are returned, so that a hash
+        collision cannot produce an illegal move.
+        """
+
+        entries = self.entries(gs.hash)
+        if not entries:
+            return []
+        validCodes = {move.code & 0x7FFFFF for move in gs.get_valid_moves()}
+        return [(ChessEngine.Move.from_code(code), weight, count) for code, weight, count in entries
+                if code & 0x7FFFFF in validCodes]
+
+    def best_move(self, gs):
+        """
+        Get the book move with the highest weight, or None if the position is not in the book.
+        """
+
+        moves = self.get_moves(gs)
+        return moves[0][0] if moves else None
+
+    def choose_move(self, gs, rng=random):
+        """
+        Pick a book move at random, in proportion to the weights, so that the computer varies its openings.
+
+        Args:
+        - gs: The game state.
+        - rng: The random number generator.
+
+        Returns:
+        A move, or None if the position is not in the book.
+        """
+
+        moves = self.get_moves(gs)
+        if not moves:
+            return None
+        weights = [weight for _, weight, _ in moves]
+        if not any(weights):
+            weights = [count for _, _, count in moves]
+        return rng.choices([move for move, _, _ in moves], weights)[0]
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Good Chess opening book")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="build a book file from a PGN file")
+    build.add_argument('input', help="PGN file")
+    build.add_argument('--output', default='book.bin')
+    build.add_argument('--plies', type=int, default=DEFAULT_BOOK_PLIES, help="plies of each game to add")
+    build.add_argument('--min-count', type=int, default=1, help="leave out moves played fewer times")
+
+    probe = subparsers.add_parser('probe', help="list the book moves of a position")
+    probe.add_argument('book', help="book file")
+    probe.add_argument('--fen', default=ChessEngine.START_FEN)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        with open(args.input, encoding='utf-8', errors='replace') as file:
+            games, skipped, records = build_book(ChessPGN.read_games(file), args.output, args.plies, args.min_count)
+        print(f"{games} games added, {skipped} skipped, {records} records written to {args.output} in "
+              f"{time.perf_counter() - start:.1f}s")
+        sys.exit(0)
+
+    gs = ChessEngine.GameState(fen=args.fen)
+    with OpeningBook(args.book) as book:
+        moves = book.get_moves(gs)
+        validMoves = gs.get_valid_moves()
+        for move, weight, count in moves:
+            print(f"{ChessPGN.move_to_san(gs, move, validMoves):<8} weight {weight:>8} count {count:>8}")
+        if not moves:
+            print("Position not in the book")
+
+
+if __name__ == "__main__":
+    main()
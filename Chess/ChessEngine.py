@@ -2,7 +2,201 @@
 Engine Script
 """
 
-import copy
+import random
+from itertools import chain
+
+from ChessEvaluation import EVAL_EG, EVAL_MG, PHASE, compute_evaluation
+
+
+KNIGHT_STEPS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_STEPS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+# The eight lines: the rook directions first (0-3), then the bishop directions (4-7).
+DIRECTIONS = ((-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+ROOK_DIRECTIONS = (0, 1, 2, 3)
+BISHOP_DIRECTIONS = (4, 5, 6, 7)
+
+
+def _build_target_table(steps):
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        table.append(tuple((r + dRow, c + dCol, (r + dRow) * 8 + c + dCol) for dRow, dCol in steps
+                           if 0 <= r + dRow < 8 and 0 <= c + dCol < 8))
+    return table
+
+
+def _build_ray_table():
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        rays = []
+        for dRow, dCol in DIRECTIONS:
+            ray = []
+            endRow, endCol = r + dRow, c + dCol
+            while 0 <= endRow < 8 and 0 <= endCol < 8:
+                ray.append((endRow, endCol, endRow * 8 + endCol))
+                endRow, endCol = endRow + dRow, endCol + dCol
+            rays.append(tuple(ray))
+        table.append(tuple(rays))
+    return table
+
+
+# Precomputed (endRow, endCol, endSq) targets, indexed by square (row * 8 + col), so the generators do not bounds-check.
+KNIGHT_TARGETS = _build_target_table(KNIGHT_STEPS)
+KING_TARGETS = _build_target_table(KING_STEPS)
+# Squares attacked by a pawn of the given colour standing on a square, left capture first.
+PAWN_CAPTURE_TARGETS = {'w': _build_target_table(((-1, -1), (-1, 1))), 'b': _build_target_table(((1, -1), (1, 1)))}
+# RAY_TARGETS[sq][direction] holds the squares from sq to the edge of the board in one of the DIRECTIONS, nearest first.
+RAY_TARGETS = _build_ray_table()
+
+# Zobrist keys come from a fixed seed so that hashes are stable between runs and can be stored in files.
+_zobristRandom = random.Random(0x600DC4E55)
+ZOBRIST_PIECES = {color + piece: [_zobristRandom.getrandbits(64) for _ in range(64)]
+                  for color in 'wb' for piece in 'PNBRQK'}
+ZOBRIST_SIDE = _zobristRandom.getrandbits(64)
+ZOBRIST_CASTLING = [_zobristRandom.getrandbits(64) for _ in range(16)]
+ZOBRIST_ENPASSANT = [_zobristRandom.getrandbits(64) for _ in range(8)]
+
+
+PIECE_NAMES = ('--', 'wP', 'wN', 'wB', 'wR', 'wQ', 'wK', 'bP', 'bN', 'bB', 'bR', 'bQ', 'bK')
+PIECE_CODES = {piece: code for code, piece in enumerate(PIECE_NAMES)}
+PROMOTION_PIECES = ('', 'Q', 'R', 'B', 'N')
+SIDE_PIECES = {'w': PIECE_NAMES[1:7], 'b': PIECE_NAMES[7:13]}
+MOVE_ENPASSANT = 1 << 20
+MOVE_CASTLE = 1 << 21
+MOVE_PROMOTION = 1 << 22
+
+
+# Castling rights are kept as a 4-bit mask.
+CASTLE_WKS = 1
+CASTLE_WQS = 2
+CASTLE_BKS = 4
+CASTLE_BQS = 8
+# Rights that survive a move from or to each square: moving the King or a rook, or capturing a rook, clears them.
+CASTLING_MASKS = [15] * 64
+CASTLING_MASKS[7 * 8 + 4] = 15 & ~(CASTLE_WKS | CASTLE_WQS)
+CASTLING_MASKS[7 * 8 + 7] = 15 & ~CASTLE_WKS
+CASTLING_MASKS[7 * 8 + 0] = 15 & ~CASTLE_WQS
+CASTLING_MASKS[0 * 8 + 4] = 15 & ~(CASTLE_BKS | CASTLE_BQS)
+CASTLING_MASKS[0 * 8 + 7] = 15 & ~CASTLE_BKS
+CASTLING_MASKS[0 * 8 + 0] = 15 & ~CASTLE_BQS
+
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+FEN_PIECES = {letter: ('w' if letter.isupper() else 'b') + letter.upper() for letter in 'PNBRQKpnbrqk'}
+FEN_LETTERS = {piece: letter for letter, piece in FEN_PIECES.items()}
+FEN_CASTLING = {'K': CASTLE_WKS, 'Q': CASTLE_WQS, 'k': CASTLE_BKS, 'q': CASTLE_BQS}
+# The King and rook each castling right needs on their home squares, as (row, col, piece).
+CASTLING_HOME_SQUARES = {CASTLE_WKS: ((7, 4, 'wK'), (7, 7, 'wR')), CASTLE_WQS: ((7, 4, 'wK'), (7, 0, 'wR')),
+                         CASTLE_BKS: ((0, 4, 'bK'), (0, 7, 'bR')), CASTLE_BQS: ((0, 4, 'bK'), (0, 0, 'bR'))}
+# Runs of empty squares, longest first, for writing the piece placement.
+FEN_EMPTY_RUNS = tuple(('-' * n, str(n)) for n in range(8, 0, -1))
+# Board rows of the FEN ranks parsed so far. Positions share most of their ranks, so that parsing a batch of positions
+# is mostly dictionary lookups. The cache is emptied when it reaches FEN_RANK_CACHE_SIZE ranks.
+FEN_RANK_CACHE_SIZE = 1 << 16
+_fenRanks = {}
+
+
+def _parse_fen_rank(rank, fen):
+    row = []
+    for ch in rank:
+        if ch in FEN_PIECES:
+            row.append(FEN_PIECES[ch])
+        elif '1' <= ch <= '8':
+            row.extend(['--'] * int(ch))
+        else:
+            raise ValueError(f"Invalid FEN piece {ch!r}: {fen!r}")
+    if len(row) != 8:
+        raise ValueError(f"Invalid FEN rank {rank!r}: {fen!r}")
+    if len(_fenRanks) >= FEN_RANK_CACHE_SIZE:
+        _fenRanks.clear()
+    _fenRanks[rank] = row = tuple(row)
+    return row
+
+
+def parse_fen(fen):
+    """
+    Parse a FEN string.
+
+    Args:
+    - fen: The FEN string. The halfmove and fullmove counters are optional and default to 0 and 1.
+
+    Returns:
+    A tuple (board, whiteToMove, castlingRights, enpassantPossible, halfmoveClock, fullmoveNumber) in the GameState
+    representation.
+
+    Raises:
+    ValueError if the string is not a valid FEN position, if either side does not have exactly one King, or if the en
+    passant square does not follow a double pawn push of the side not to move.
+
+    Castling rights whose King or rook is not on its home square are dropped.
+    """
+
+    fields = fen.split()
+    if not 4 <= len(fields) <= 6:
+        raise ValueError(f"Invalid FEN, expected 4 to 6 fields: {fen!r}")
+    ranks = fields[0].split('/')
+    if len(ranks) != 8:
+        raise ValueError(f"Invalid FEN, expected 8 ranks: {fen!r}")
+    board = [list(_fenRanks.get(rank) or _parse_fen_rank(rank, fen)) for rank in ranks]
+    for king in ('wK', 'bK'):
+        if sum(row.count(king) for row in board) != 1:
+            raise ValueError(f"Invalid FEN, expected one {'White' if king == 'wK' else 'Black'} King: {fen!r}")
+    side = fields[1]
+    if side != 'w' and side != 'b':
+        raise ValueError(f"Invalid FEN side to move {side!r}: {fen!r}")
+    castlingRights = 0
+    if fields[2] != '-':
+        for ch in fields[2]:
+            if ch not in FEN_CASTLING:
+                raise ValueError(f"Invalid FEN castling rights {fields[2]!r}: {fen!r}")
+            castlingRights |= FEN_CASTLING[ch]
+        for right, squares in CASTLING_HOME_SQUARES.items():
+            if castlingRights & right and any(board[r][c] != piece for r, c, piece in squares):
+                castlingRights &= ~right
+    enpassant = fields[3]
+    if enpassant == '-':
+        enpassantPossible = ()
+    elif len(enpassant) == 2 and enpassant[0] in Move.filesToCols and enpassant[1] == ('6' if side == 'w' else '3'):
+        # The square must be the one skipped by a double push of the side not to move.
+        r, c = Move.ranksToRows[enpassant[1]], Move.filesToCols[enpassant[0]]
+        direction = 1 if side == 'w' else -1
+        if board[r][c] != '--' or board[r - direction][c] != '--' or \
+                board[r + direction][c] != ('bP' if side == 'w' else 'wP'):
+            raise ValueError(f"Invalid FEN en passant square {enpassant!r}, no pawn just pushed past it: {fen!r}")
+        enpassantPossible = (r, c)
+    else:
+        raise ValueError(f"Invalid FEN en passant square {enpassant!r}: {fen!r}")
+    try:
+        halfmoveClock = int(fields[4]) if len(fields) > 4 else 0
+        fullmoveNumber = int(fields[5]) if len(fields) > 5 else 1
+    except ValueError:
+        raise ValueError(f"Invalid FEN move counters: {fen!r}") from None
+    if halfmoveClock < 0 or fullmoveNumber < 1:
+        raise ValueError(f"Invalid FEN move counters: {fen!r}")
+    return board, side == 'w', castlingRights, enpassantPossible, halfmoveClock, fullmoveNumber
+
+
+def expand_promotions(moves):
+    """
+    Replace each promotion in a list of moves with one move per promotion piece.
+
+    Args:
+    - moves: A list of Move objects, as returned by GameState.get_valid_moves.
+
+    Returns:
+    A new list of Move objects. get_valid_moves returns one promotion per square and leaves the piece to
+    gs.promotionChoice; the expanded moves carry their piece ('Q', 'R', 'B' or 'N') themselves.
+    """
+
+    expanded = []
+    for move in moves:
+        if move.code & MOVE_PROMOTION and not move.code >> 23 & 7:
+            for piece in range(1, len(PROMOTION_PIECES)):
+                expanded.append(Move.from_code(move.code | piece << 23))
+        else:
+            expanded.append(move)
+    return expanded
 
 
 class GameState:
@@ -14,37 +208,165 @@ class GameState:
             - moveFunctions: Dictionary mapping piece types to their respective move functions.
             - whiteToMove: Boolean flag indicating if it's White's turn.
             - moveLog: A list to keep track of the moves made in the game.
+            - pieceSquares: Dictionary mapping each piece (e.g. 'wP') to the set of squares (row * 8 + col) it
+              occupies, kept up to date by make_move and undo_move.
             - whiteKingLocation: Tuple representing the current location of the White King.
             - blackKingLocation: Tuple representing the current location of the Black King.
             - checkMate: Boolean flag indicating if the game is in a checkmate condition.
             - staleMate: Boolean flag indicating if the game is in a stalemate condition.
+            - castlingRights: Castling rights as a 4-bit mask of the CASTLE_* flags.
+            - undoLog: One (castlingRights, enpassantPossible, pieceCaptured, hash, mgScore, egScore, phase,
+              halfmoveClock) record per move made, restored by undo_move.
+            - halfmoveClock: Number of plies since the last capture or pawn move, for the fifty-move rule.
+            - fullmoveNumber: The move number, starting at 1 and increased after each Black move.
+            - hash: 64-bit Zobrist key of the position, kept up to date by make_move and undo_move.
+            - debugHash: When True, the hash is checked against a full recompute after every move and undo.
+            - mgScore, egScore: Middlegame and endgame material and piece-square scores from White's point of view,
+              kept up to date by make_move and undo_move.
+            - phase: Game phase from the pieces left on the board (ChessEvaluation.MAX_PHASE at the start).
+            - debugEval: When True, the evaluation terms are checked against a full recompute after every move and
+              undo.
     """
 
-    def __init__(self):
-
-        self.board = [
-            ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
-            ["bP", "bP", "bP", "bP", "bP", "bP", "bP", "bP"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["--", "--", "--", "--", "--", "--", "--", "--"],
-            ["wP", "wP", "wP", "wP", "wP", "wP", "wP", "wP"],
-            ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]]
+    def __init__(self, debugHash=False, debugEval=False, fen=START_FEN):
+
+        self.board, self.whiteToMove, self.castlingRights, self.enpassantPossible, self.halfmoveClock, \
+            self.fullmoveNumber = parse_fen(fen)
         self.moveFunctions = {'P': self.get_pawn_moves, 'R': self.get_rook_moves, 'N': self.get_knight_moves,
                               'B': self.get_bishop_moves, 'Q': self.get_queen_moves, 'K': self.get_king_moves}
 
-        self.whiteToMove = True
         self.moveLog = []
         self.promotionChoice = 'Q'
-        self.whiteKingLocation = (7, 4)
-        self.blackKingLocation = (0, 4)
+        self.pieceSquares = {}
+        self.sync_piece_squares()
         self.checkMate = False
         self.staleMate = False
-        self.enpassantPossible = ()
-        self.currentCastlingRights = CastleRights(True, True, True, True)
-        self.castleRightsLog = [CastleRights(self.currentCastlingRights.wks, self.currentCastlingRights.bks,
-                                             self.currentCastlingRights.wqs, self.currentCastlingRights.bqs)]
+        self.undoLog = []
+        self.inCheck = False
+        self.pins = {}
+        self.checks = []
+        self.debugHash = debugHash
+        self.hash = self.compute_hash()
+        self.debugEval = debugEval
+        self.mgScore, self.egScore, self.phase = compute_evaluation(self.board)
+
+    @classmethod
+    def from_fen(cls, fen, debugHash=False, debugEval=False):
+        """
+        Create a game state from a FEN string.
+
+        Args:
+        - fen: The FEN string of the position.
+        - debugHash: Check the hash against a full recompute after every move and undo.
+        - debugEval: Check the evaluation terms against a full recompute after every move and undo.
+
+        Returns:
+        A new GameState with the position, side to move, castling rights, en passant square and move counters of the
+        FEN.
+
+        Raises:
+        ValueError if the string is not a valid FEN position.
+        """
+
+        return cls(debugHash, debugEval, fen)
+
+    def to_fen(self):
+        """
+        Get the FEN string of the current position.
+
+        Returns:
+        The FEN string, with the en passant square set after every double pawn push as in the hash.
+        """
+
+        placement = '/'.join(''.join([FEN_LETTERS.get(piece, '-') for piece in row]) for row in self.board)
+        for run, count in FEN_EMPTY_RUNS:
+            placement = placement.replace(run, count)
+        castling = ''.join([letter for letter, flag in FEN_CASTLING.items() if self.castlingRights & flag]) or '-'
+        if self.enpassantPossible:
+            row, col = self.enpassantPossible
+            enpassant = Move.colsToFiles[col] + Move.rowsToRanks[row]
+        else:
+            enpassant = '-'
+        return (f"{placement} {'w' if self.whiteToMove else 'b'} {castling} {enpassant} {self.halfmoveClock} "
+                f"{self.fullmoveNumber}")
+
+    def sync_piece_squares(self):
+        """
+        Rebuild the piece squares from the 2D board.
+
+        This method is used after setting up a position directly on the board.
+        """
+
+        self.pieceSquares = pieceSquares = {piece: set() for piece in PIECE_NAMES[1:]}
+        for sq, piece in enumerate(chain.from_iterable(self.board)):
+            if piece != "--":
+                pieceSquares[piece].add(sq)
+
+    @property
+    def whiteKingLocation(self):
+        """
+        The (row, col) of the White King, taken from the piece squares.
+        """
+
+        for sq in self.pieceSquares['wK']:
+            return sq >> 3, sq & 7
+
+    @property
+    def blackKingLocation(self):
+        """
+        The (row, col) of the Black King, taken from the piece squares.
+        """
+
+        for sq in self.pieceSquares['bK']:
+            return sq >> 3, sq & 7
+
+    def piece_count(self, piece):
+        """
+        Count the pieces of a kind on the board.
+
+        Args:
+        - piece: The piece to count (e.g. 'wN').
+
+        Returns:
+        The number of such pieces, read from the piece squares without scanning the board.
+        """
+
+        return len(self.pieceSquares[piece])
+
+    def insufficient_material(self):
+        """
+        Check if neither player has enough material left to checkmate.
+
+        Returns:
+        True for King against King, King and a single minor piece against King, and King and bishop against King and
+        bishop with both bishops on the same colour, False otherwise.
+        """
+
+        pieceSquares = self.pieceSquares
+        for piece in ('wP', 'bP', 'wR', 'bR', 'wQ', 'bQ'):
+            if pieceSquares[piece]:
+                return False
+        whiteMinors = len(pieceSquares['wN']) + len(pieceSquares['wB'])
+        blackMinors = len(pieceSquares['bN']) + len(pieceSquares['bB'])
+        if whiteMinors + blackMinors <= 1:
+            return True
+        if whiteMinors == 1 and blackMinors == 1 and len(pieceSquares['wB']) == 1 and len(pieceSquares['bB']) == 1:
+            whiteBishop, = pieceSquares['wB']
+            blackBishop, = pieceSquares['bB']
+            return ((whiteBishop >> 3) + whiteBishop) % 2 == ((blackBishop >> 3) + blackBishop) % 2
+        return False
+
+    @property
+    def currentCastlingRights(self):
+        """
+        The castling rights as a CastleRights object, converted from and to the castlingRights mask.
+        """
+
+        return CastleRights.from_mask(self.castlingRights)
+
+    @currentCastlingRights.setter
+    def currentCastlingRights(self, castleRights):
+        self.castlingRights = castleRights.to_mask()
 
     def make_move(self, move):
         """
@@ -53,73 +375,183 @@ class GameState:
                 Args:
                 - move: An instance of the Move class representing the move to be made.
 
-                This method updates the board, move log, and other game state attributes.
+                This method updates the board, move log, hash, evaluation terms, and other game state attributes.
         """
 
-        self.board[move.startRow][move.startCol] = "--"
-        self.board[move.endRow][move.endCol] = move.pieceMoved
+        code = move.code
+        if code & MOVE_PROMOTION and not (code >> 23) & 7:
+            # Log the piece the pawn becomes, so that the game can be replayed and written out.
+            code |= PROMOTION_PIECES.index(self.promotionChoice) << 23
+            move = Move.from_code(code)
+        startSq = code & 63
+        endSq = (code >> 6) & 63
+        startRow, startCol = startSq >> 3, startSq & 7
+        endRow, endCol = endSq >> 3, endSq & 7
+        pieceMoved = PIECE_NAMES[(code >> 12) & 15]
+        pieceCaptured = PIECE_NAMES[(code >> 16) & 15]
+        board = self.board
+        self.undoLog.append((self.castlingRights, self.enpassantPossible, pieceCaptured, self.hash, self.mgScore,
+                             self.egScore, self.phase, self.halfmoveClock))
+        if pieceMoved[1] == 'P' or pieceCaptured != '--':
+            self.halfmoveClock = 0
+        else:
+            self.halfmoveClock += 1
+        zobristHash = self.hash ^ ZOBRIST_SIDE ^ ZOBRIST_PIECES[pieceMoved][startSq] ^ \
+            ZOBRIST_CASTLING[self.castlingRights]
+        if self.enpassantPossible:
+            zobristHash ^= ZOBRIST_ENPASSANT[self.enpassantPossible[1]]
+
+        pieceSquares = self.pieceSquares
+        board[startRow][startCol] = "--"
+        board[endRow][endCol] = pieceMoved
         self.moveLog.append(move)
         self.whiteToMove = not self.whiteToMove
-        if move.pieceMoved == 'wK':
-            self.whiteKingLocation = (move.endRow, move.endCol)
-        if move.pieceMoved == 'bK':
-            self.blackKingLocation = (move.endRow, move.endCol)
-
-        if move.isPawnPromotion:
-            self.board[move.endRow][move.endCol] = move.pieceMoved[0] + self.promotionChoice
-
-        if move.isEnpassantMove:
-            self.board[move.startRow][move.endCol] = '--'
-        if move.pieceMoved[1] == 'P' and abs(move.startRow - move.endRow) == 2:
-            self.enpassantPossible = ((move.startRow + move.endRow) // 2, move.startCol)
+        if self.whiteToMove:
+            self.fullmoveNumber += 1
+
+        if code & MOVE_PROMOTION:
+            board[endRow][endCol] = pieceMoved[0] + PROMOTION_PIECES[(code >> 23) & 7]
+        piecePlaced = board[endRow][endCol]
+        pieceSquares[pieceMoved].remove(startSq)
+        pieceSquares[piecePlaced].add(endSq)
+        zobristHash ^= ZOBRIST_PIECES[piecePlaced][endSq]
+        mgScore = self.mgScore - EVAL_MG[pieceMoved][startSq] + EVAL_MG[piecePlaced][endSq]
+        egScore = self.egScore - EVAL_EG[pieceMoved][startSq] + EVAL_EG[piecePlaced][endSq]
+        self.phase += PHASE[piecePlaced] - PHASE[pieceMoved]
+
+        if pieceCaptured != '--':
+            capturedSq = startRow * 8 + endCol if code & MOVE_ENPASSANT else endSq
+            if code & MOVE_ENPASSANT:
+                board[startRow][endCol] = '--'
+            pieceSquares[pieceCaptured].remove(capturedSq)
+            zobristHash ^= ZOBRIST_PIECES[pieceCaptured][capturedSq]
+            mgScore -= EVAL_MG[pieceCaptured][capturedSq]
+            egScore -= EVAL_EG[pieceCaptured][capturedSq]
+            self.phase -= PHASE[pieceCaptured]
+        if pieceMoved[1] == 'P' and abs(startRow - endRow) == 2:
+            self.enpassantPossible = ((startRow + endRow) // 2, startCol)
+            zobristHash ^= ZOBRIST_ENPASSANT[startCol]
         else:
             self.enpassantPossible = ()
 
-        if move.isCastleMove:
-            if move.endCol - move.startCol == 2:
-                self.board[move.endRow][move.endCol - 1] = self.board[move.endRow][move.endCol + 1]
-                self.board[move.endRow][move.endCol + 1] = '--'
+        if code & MOVE_CASTLE:
+            if endCol - startCol == 2:
+                rookFrom, rookTo = endCol + 1, endCol - 1
             else:
-                self.board[move.endRow][move.endCol + 1] = self.board[move.endRow][move.endCol - 2]
-                self.board[move.endRow][move.endCol - 2] = '--'
+                rookFrom, rookTo = endCol - 2, endCol + 1
+            rook = board[endRow][rookFrom]
+            board[endRow][rookTo] = rook
+            board[endRow][rookFrom] = '--'
+            pieceSquares[rook].remove(endRow * 8 + rookFrom)
+            pieceSquares[rook].add(endRow * 8 + rookTo)
+            zobristHash ^= ZOBRIST_PIECES[rook][endRow * 8 + rookFrom] ^ ZOBRIST_PIECES[rook][endRow * 8 + rookTo]
+            mgScore += EVAL_MG[rook][endRow * 8 + rookTo] - EVAL_MG[rook][endRow * 8 + rookFrom]
+            egScore += EVAL_EG[rook][endRow * 8 + rookTo] - EVAL_EG[rook][endRow * 8 + rookFrom]
 
         self.update_castling_rights(move)
-        self.castleRightsLog.append(CastleRights(self.currentCastlingRights.wks, self.currentCastlingRights.bks,
-                                                 self.currentCastlingRights.wqs, self.currentCastlingRights.bqs))
+        self.hash = zobristHash ^ ZOBRIST_CASTLING[self.castlingRights]
+        self.mgScore = mgScore
+        self.egScore = egScore
+        if self.debugHash:
+            self.verify_hash()
+        if self.debugEval:
+            self.verify_evaluation()
 
     def undo_move(self):
         """
         Undo the last move made in the game.
 
-        This method reverts the game state to the previous state by removing the last move made.
+        This method reverts the game state to the previous state by removing the last move made. Castling rights,
+        the en passant square, the hash and the evaluation terms are restored from the move's undo record rather than
+        recomputed.
         """
 
         if len(self.moveLog) != 0:
             move = self.moveLog.pop()
-            self.board[move.startRow][move.startCol] = move.pieceMoved
-            self.board[move.endRow][move.endCol] = move.pieceCaptured
+            self.castlingRights, self.enpassantPossible, pieceCaptured, self.hash, self.mgScore, self.egScore, \
+                self.phase, self.halfmoveClock = self.undoLog.pop()
+            code = move.code
+            startRow, startCol = (code & 63) >> 3, code & 7
+            endRow, endCol = (code >> 9) & 7, (code >> 6) & 7
+            pieceMoved = PIECE_NAMES[(code >> 12) & 15]
+            board = self.board
+            pieceSquares = self.pieceSquares
+
+            pieceSquares[board[endRow][endCol]].remove(code >> 6 & 63)
+            pieceSquares[pieceMoved].add(code & 63)
+            board[startRow][startCol] = pieceMoved
+            board[endRow][endCol] = pieceCaptured
             self.whiteToMove = not self.whiteToMove
-            if move.pieceMoved == 'wK':
-                self.whiteKingLocation = (move.startRow, move.startCol)
-            if move.pieceMoved == 'bK':
-                self.blackKingLocation = (move.startRow, move.startCol)
-            if move.isEnpassantMove:
-                self.board[move.endRow][move.endCol] = '--'
-                self.board[move.startRow][move.endCol] = move.pieceCaptured
-                self.enpassantPossible = (move.endRow, move.endCol)
-            if move.pieceMoved[1] == 'P' and abs(move.startRow - move.endRow) == 2:
-                self.enpassantPossible = ()
-
-            self.castleRightsLog.pop()
-            castleRights = copy.deepcopy(self.castleRightsLog[-1])
-            self.currentCastlingRights = castleRights
-            if move.isCastleMove:
-                if move.endCol - move.startCol == 2:
-                    self.board[move.endRow][move.endCol + 1] = self.board[move.endRow][move.endCol - 1]
-                    self.board[move.endRow][move.endCol - 1] = '--'
+            if not self.whiteToMove:
+                self.fullmoveNumber -= 1
+            if code & MOVE_ENPASSANT:
+                board[endRow][endCol] = '--'
+                board[startRow][endCol] = pieceCaptured
+                pieceSquares[pieceCaptured].add(startRow * 8 + endCol)
+            elif pieceCaptured != '--':
+                pieceSquares[pieceCaptured].add(code >> 6 & 63)
+            elif code & MOVE_CASTLE:
+                if endCol - startCol == 2:
+                    rookFrom, rookTo = endCol + 1, endCol - 1
                 else:
-                    self.board[move.endRow][move.endCol - 2] = self.board[move.endRow][move.endCol + 1]
-                    self.board[move.endRow][move.endCol + 1] = '--'
+                    rookFrom, rookTo = endCol - 2, endCol + 1
+                rook = board[endRow][rookTo]
+                board[endRow][rookFrom] = rook
+                board[endRow][rookTo] = '--'
+                pieceSquares[rook].remove(endRow * 8 + rookTo)
+                pieceSquares[rook].add(endRow * 8 + rookFrom)
+            if self.debugHash:
+                self.verify_hash()
+            if self.debugEval:
+                self.verify_evaluation()
+
+    def compute_hash(self):
+        """
+        Compute the Zobrist hash of the position from scratch.
+
+        Returns:
+        A 64-bit integer identifying the piece placement, side to move, castling rights and en passant square.
+
+        make_move and undo_move keep self.hash up to date incrementally; this method is the reference they are
+        checked against.
+        """
+
+        zobristHash = 0
+        for sq, piece in enumerate(chain.from_iterable(self.board)):
+            if piece != '--':
+                zobristHash ^= ZOBRIST_PIECES[piece][sq]
+        if not self.whiteToMove:
+            zobristHash ^= ZOBRIST_SIDE
+        zobristHash ^= ZOBRIST_CASTLING[self.castlingRights]
+        if self.enpassantPossible:
+            zobristHash ^= ZOBRIST_ENPASSANT[self.enpassantPossible[1]]
+        return zobristHash
+
+    def verify_hash(self):
+        """
+        Check the incrementally updated hash against a full recompute.
+
+        Raises:
+        RuntimeError if the hashes differ.
+        """
+
+        expected = self.compute_hash()
+        if self.hash != expected:
+            raise RuntimeError(f"Zobrist hash out of sync after {len(self.moveLog)} moves: "
+                               f"{self.hash:016x} != {expected:016x}")
+
+    def verify_evaluation(self):
+        """
+        Check the incrementally updated evaluation terms against a full recompute.
+
+        Raises:
+        RuntimeError if they differ.
+        """
+
+        expected = compute_evaluation(self.board)
+        if (self.mgScore, self.egScore, self.phase) != expected:
+            raise RuntimeError(f"Evaluation out of sync after {len(self.moveLog)} moves: "
+                               f"{(self.mgScore, self.egScore, self.phase)} != {expected}")
 
     def update_castling_rights(self, move):
         """
@@ -128,39 +560,10 @@ class GameState:
         Args:
         - move: An instance of the Move class representing the move to be made.
 
-        This method updates the castling rights after a move is made.
-        """
-
-        if move.pieceMoved == 'wK':
-            self.currentCastlingRights.wks = False
-            self.currentCastlingRights.wqs = False
-        elif move.pieceMoved == 'bK':
-            self.currentCastlingRights.bks = False
-            self.currentCastlingRights.bqs = False
-        elif move.pieceMoved == 'wR':
-            if move.startRow == 7:
-                if move.startCol == 0:
-                    self.currentCastlingRights.wqs = False
-                elif move.startCol == 7:
-                    self.currentCastlingRights.wks = False
-        elif move.pieceMoved == 'bR':
-            if move.startRow == 0:
-                if move.startCol == 0:
-                    self.currentCastlingRights.bqs = False
-                elif move.startCol == 7:
-                    self.currentCastlingRights.bks = False
-        if move.pieceCaptured == 'wR':
-            if move.endRow == 7:
-                if move.endCol == 0:
-                    self.currentCastlingRights.wqs = False
-                elif move.endCol == 7:
-                    self.currentCastlingRights.wks = False
-        elif move.pieceCaptured == 'bR':
-            if move.endRow == 0:
-                if move.endCol == 0:
-                    self.currentCastlingRights.bqs = False
-                elif move.endCol == 7:
-                    self.currentCastlingRights.bks = False
+        This method clears the rights of a King or rook that moves, and of a rook that is captured.
+        """
+
+        self.castlingRights &= CASTLING_MASKS[move.code & 63] & CASTLING_MASKS[(move.code >> 6) & 63]
 
     def get_valid_moves(self):
         """
@@ -169,26 +572,44 @@ class GameState:
         Returns:
         A list of valid Move objects that can be made by the current player.
 
-        This method calculates all possible moves and filters out those that would leave the player's own King in check.
-        If there are no valid moves, it also checks for checkmate and stalemate conditions.
+        This method finds the checks and pins on the current player's King once, then generates only moves that keep
+        the King safe: pinned pieces stay on their pin line, and when in check only King moves, captures of the
+        checking piece and blocks are generated. If there are no valid moves, it also checks for checkmate and
+        stalemate conditions.
         """
-        tempEnpassantPossible = self.enpassantPossible
-        tempCastleRights = CastleRights(self.currentCastlingRights.wks, self.currentCastlingRights.bks,
-                                        self.currentCastlingRights.wqs, self.currentCastlingRights.bqs)
-        moves = self.get_all_possible_moves()
+
+        self.inCheck, pins, self.checks = self.check_for_pins_and_checks()
+        self.pins = {(pin[0], pin[1]): (pin[2], pin[3]) for pin in pins}
         if self.whiteToMove:
-            self.get_castle_moves(self.whiteKingLocation[0], self.whiteKingLocation[1], moves)
+            kingRow, kingCol = self.whiteKingLocation
         else:
-            self.get_castle_moves(self.blackKingLocation[0], self.blackKingLocation[1], moves)
-        for i in range(len(moves) - 1, -1, -1):
-            self.make_move(moves[i])
-            self.whiteToMove = not self.whiteToMove
-            if self.in_check():
-                moves.remove(moves[i])
-            self.whiteToMove = not self.whiteToMove
-            self.undo_move()
+            kingRow, kingCol = self.blackKingLocation
+        if self.inCheck:
+            if len(self.checks) == 1:
+                moves = self.get_all_possible_moves()
+                checkRow, checkCol, dRow, dCol = self.checks[0]
+                if self.board[checkRow][checkCol][1] == 'N':
+                    validSquares = {(checkRow, checkCol)}
+                else:
+                    validSquares = set()
+                    for i in range(1, 8):
+                        validSquare = (kingRow + dRow * i, kingCol + dCol * i)
+                        validSquares.add(validSquare)
+                        if validSquare == (checkRow, checkCol):
+                            break
+                moves = [move for move in moves
+                         if move.pieceMoved[1] == 'K' or (move.endRow, move.endCol) in validSquares or
+                         (move.isEnpassantMove and (move.startRow, move.endCol) in validSquares)]
+            else:
+                moves = []
+                self.get_king_moves(kingRow, kingCol, moves)
+        else:
+            moves = self.get_all_possible_moves()
+            self.get_castle_moves(kingRow, kingCol, moves)
+        self.pins = {}
+
         if len(moves) == 0:
-            if self.in_check():
+            if self.inCheck:
                 self.checkMate = True
             else:
                 self.staleMate = True
@@ -196,10 +617,63 @@ class GameState:
             self.checkMate = False
             self.staleMate = False
 
-        self.enpassantPossible = tempEnpassantPossible
-        self.currentCastlingRights = tempCastleRights
         return moves
 
+    def check_for_pins_and_checks(self):
+        """
+        Find the pieces checking the current player's King and the current player's pieces pinned to it.
+
+        Returns:
+        A tuple (inCheck, pins, checks) where pins and checks are lists of (row, col, dRow, dCol): the square of the
+        pinned or checking piece and the direction from the King towards it.
+
+        This method looks outward from the King along the eight lines and the knight jumps, so it only visits the
+        squares that can hold a checking or pinning piece.
+        """
+
+        pins = []
+        checks = []
+        inCheck = False
+        if self.whiteToMove:
+            enemyColor, allyColor = 'b', 'w'
+            startRow, startCol = self.whiteKingLocation
+        else:
+            enemyColor, allyColor = 'w', 'b'
+            startRow, startCol = self.blackKingLocation
+        rays = RAY_TARGETS[startRow * 8 + startCol]
+        for j in range(8):
+            d = DIRECTIONS[j]
+            possiblePin = ()
+            i = 0
+            for endRow, endCol, _ in rays[j]:
+                i += 1
+                endPiece = self.board[endRow][endCol]
+                # The King itself is skipped so that its moves can be tested by only moving its location.
+                if endPiece[0] == allyColor and endPiece[1] != 'K':
+                    if possiblePin == ():
+                        possiblePin = (endRow, endCol, d[0], d[1])
+                    else:
+                        break
+                elif endPiece[0] == enemyColor:
+                    pieceType = endPiece[1]
+                    if (0 <= j <= 3 and pieceType == 'R') or (4 <= j <= 7 and pieceType == 'B') or \
+                            (i == 1 and pieceType == 'P' and (
+                                    (enemyColor == 'w' and 6 <= j <= 7) or (enemyColor == 'b' and 4 <= j <= 5))) or \
+                            pieceType == 'Q' or (i == 1 and pieceType == 'K'):
+                        if possiblePin == ():
+                            inCheck = True
+                            checks.append((endRow, endCol, d[0], d[1]))
+                        else:
+                            pins.append(possiblePin)
+                    break
+
+        enemyKnight = enemyColor + 'N'
+        for endRow, endCol, _ in KNIGHT_TARGETS[startRow * 8 + startCol]:
+            if self.board[endRow][endCol] == enemyKnight:
+                inCheck = True
+                checks.append((endRow, endCol, endRow - startRow, endCol - startCol))
+        return inCheck, pins, checks
+
     def in_check(self):
         """
         Check if the current player's King is in check.
@@ -224,16 +698,57 @@ class GameState:
         Returns:
         True if the square is under attack, False otherwise.
 
-        This method temporarily simulates the opponent's moves to check if they can attack the specified square.
+        This method looks outward from the square and stops at the first attacking piece it finds.
         """
 
-        self.whiteToMove = not self.whiteToMove
-        oppMoves = self.get_all_possible_moves()
-        self.whiteToMove = not self.whiteToMove
-        for move in oppMoves:
-            if move.endRow == r and move.endCol == c:
-                return True
-        return False
+        return len(self.get_attackers(r, c, firstOnly=True)) > 0
+
+    def get_attackers(self, r, c, firstOnly=False):
+        """
+        Get the opponent's pieces attacking a square on the chessboard.
+
+        Args:
+        - r: The row of the square.
+        - c: The column of the square.
+        - firstOnly: Stop after the first attacker found.
+
+        Returns:
+        A list of (row, col, dRow, dCol) for each attacking piece: its square and the step from the square towards it.
+
+        This method looks outward from the square along the pawn, knight and king steps and the eight lines, without
+        generating the opponent's moves. The current player's King does not block lines, so the result also holds for
+        squares the King is moving to.
+        """
+
+        attackers = []
+        board = self.board
+        sq = r * 8 + c
+        if self.whiteToMove:
+            allyColor, enemyColor, allyKing = 'w', 'b', 'wK'
+        else:
+            allyColor, enemyColor, allyKing = 'b', 'w', 'bK'
+
+        # An enemy pawn attacks the square from the squares an ally pawn on it would attack.
+        for targets, piece in ((PAWN_CAPTURE_TARGETS[allyColor][sq], enemyColor + 'P'),
+                               (KNIGHT_TARGETS[sq], enemyColor + 'N'), (KING_TARGETS[sq], enemyColor + 'K')):
+            for endRow, endCol, _ in targets:
+                if board[endRow][endCol] == piece:
+                    attackers.append((endRow, endCol, endRow - r, endCol - c))
+                    if firstOnly:
+                        return attackers
+
+        rays = RAY_TARGETS[sq]
+        for j in range(8):
+            sliders = ('R', 'Q') if j < 4 else ('B', 'Q')
+            for endRow, endCol, _ in rays[j]:
+                endPiece = board[endRow][endCol]
+                if endPiece != '--' and endPiece != allyKing:
+                    if endPiece[0] == enemyColor and endPiece[1] in sliders:
+                        attackers.append((endRow, endCol, DIRECTIONS[j][0], DIRECTIONS[j][1]))
+                        if firstOnly:
+                            return attackers
+                    break
+        return attackers
 
     def get_all_possible_moves(self):
         """
@@ -243,15 +758,14 @@ class GameState:
         A list of all possible Move objects that can be made by the current player, including legal and illegal moves.
 
         This method generates all possible moves for the current player's pieces, regardless of whether they are legal.
+        Only the squares in the current player's piece squares are visited.
         """
 
         moves = []
-        for r in range(len(self.board)):
-            for c in range(len(self.board[r])):
-                turn = self.board[r][c][0]
-                if (turn == 'w' and self.whiteToMove) or (turn == 'b' and not self.whiteToMove):
-                    piece = self.board[r][c][1]
-                    self.moveFunctions[piece](r, c, moves)
+        for piece in SIDE_PIECES['w' if self.whiteToMove else 'b']:
+            moveFunction = self.moveFunctions[piece[1]]
+            for sq in self.pieceSquares[piece]:
+                moveFunction(sq >> 3, sq & 7, moves)
         return moves
 
     def get_pawn_moves(self, r, c, moves):
@@ -263,39 +777,64 @@ class GameState:
         - c: The column of the pawn.
         - moves: A list to append the generated moves to.
 
-        This method generates all possible moves for a pawn at the specified square.
+        This method generates all possible moves for a pawn at the specified square, keeping a pinned pawn on its pin
+        line.
         """
 
+        pinDirection = self.pins.get((r, c))
         if self.whiteToMove:
-            if self.board[r - 1][c] == "--":
-                moves.append(Move((r, c), (r - 1, c), self.board))
-                if r == 6 and self.board[r - 2][c] == "--":
-                    moves.append(Move((r, c), (r - 2, c), self.board))
-            if c - 1 >= 0:
-                if self.board[r - 1][c - 1][0] == 'b':
-                    moves.append(Move((r, c), (r - 1, c - 1), self.board))
-                elif (r - 1, c - 1) == self.enpassantPossible:
-                    moves.append(Move((r, c), (r - 1, c - 1), self.board, isEnpassantMove=True))
-            if c + 1 <= 7:
-                if self.board[r - 1][c + 1][0] == 'b':
-                    moves.append(Move((r, c), (r - 1, c + 1), self.board))
-                elif (r - 1, c + 1) == self.enpassantPossible:
-                    moves.append(Move((r, c), (r - 1, c + 1), self.board, isEnpassantMove=True))
+            moveAmount, startRow, enemyColor = -1, 6, 'b'
         else:
-            if self.board[r + 1][c] == "--" and self.board[r + 1][c] is not None:
-                moves.append(Move((r, c), (r + 1, c), self.board))
-                if r == 1 and self.board[r + 2][c] == "--":
-                    moves.append(Move((r, c), (r + 2, c), self.board))
-            if c - 1 >= 0:
-                if self.board[r + 1][c - 1][0] == 'w':
-                    moves.append(Move((r, c), (r + 1, c - 1), self.board))
-                elif (r + 1, c - 1) == self.enpassantPossible:
-                    moves.append(Move((r, c), (r + 1, c - 1), self.board, isEnpassantMove=True))
-            if c + 1 <= 7:
-                if self.board[r + 1][c + 1][0] == 'w':
-                    moves.append(Move((r, c), (r + 1, c + 1), self.board))
-                elif (r + 1, c + 1) == self.enpassantPossible:
-                    moves.append(Move((r, c), (r + 1, c + 1), self.board, isEnpassantMove=True))
+            moveAmount, startRow, enemyColor = 1, 1, 'w'
+        endRow = r + moveAmount
+        base = r * 8 + c | PIECE_CODES[self.board[r][c]] << 12
+        if endRow == 0 or endRow == 7:
+            base |= MOVE_PROMOTION
+
+        if self.board[endRow][c] == "--":
+            if pinDirection is None or pinDirection == (moveAmount, 0) or pinDirection == (-moveAmount, 0):
+                moves.append(Move.from_code(base | (endRow * 8 + c) << 6))
+                if r == startRow and self.board[endRow + moveAmount][c] == "--":
+                    moves.append(Move.from_code(base | ((endRow + moveAmount) * 8 + c) << 6))
+        for endRow, endCol, endSq in PAWN_CAPTURE_TARGETS['b' if enemyColor == 'w' else 'w'][r * 8 + c]:
+            dCol = endCol - c
+            if pinDirection is not None and pinDirection != (moveAmount, dCol) and \
+                    pinDirection != (-moveAmount, -dCol):
+                continue
+            endPiece = self.board[endRow][endCol]
+            if endPiece[0] == enemyColor:
+                moves.append(Move.from_code(base | endSq << 6 | PIECE_CODES[endPiece] << 16))
+            elif (endRow, endCol) == self.enpassantPossible and not self.enpassant_exposes_king(r, c, endCol):
+                moves.append(Move.from_code(base | endSq << 6 | PIECE_CODES[enemyColor + 'P'] << 16 | MOVE_ENPASSANT))
+
+    def enpassant_exposes_king(self, r, c, capturedCol):
+        """
+        Check if an en passant capture would expose the current player's King along its row.
+
+        Args:
+        - r: The row of the capturing pawn (and of the captured pawn).
+        - c: The column of the capturing pawn.
+        - capturedCol: The column of the captured pawn.
+
+        Returns:
+        True if removing both pawns from the row opens a rook or queen line onto the King, False otherwise.
+
+        Both pawns leave the same row in an en passant capture, which the pin detection cannot see.
+        """
+
+        kingRow, kingCol = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+        if kingRow != r:
+            return False
+        enemyColor = 'b' if self.whiteToMove else 'w'
+        step = 1 if c > kingCol else -1
+        col = kingCol + step
+        while 0 <= col < 8:
+            if col != c and col != capturedCol:
+                piece = self.board[r][col]
+                if piece != '--':
+                    return piece[0] == enemyColor and piece[1] in ('R', 'Q')
+            col += step
+        return False
 
     def get_rook_moves(self, r, c, moves):
         """
@@ -309,22 +848,39 @@ class GameState:
         This method generates all possible moves for a rook at the specified square.
         """
 
-        direction = ((-1, 0), (0, -1), (1, 0), (0, 1))
+        self.get_sliding_moves(r, c, ROOK_DIRECTIONS, moves)
+
+    def get_sliding_moves(self, r, c, directions, moves):
+        """
+        Get possible moves for a sliding piece at a given square.
+
+        Args:
+        - r: The row of the piece.
+        - c: The column of the piece.
+        - directions: The indices into DIRECTIONS the piece slides in.
+        - moves: A list to append the generated moves to.
+
+        This method generates the moves along each direction up to the first blocker, only along the pin line if the
+        piece is pinned.
+        """
+
+        pinDirection = self.pins.get((r, c))
         enemyColor = 'b' if self.whiteToMove else 'w'
-        for d in direction:
-            for i in range(1, 8):
-                endRow = r + d[0] * i
-                endCol = c + d[1] * i
-                if (0 <= endRow < 8) and (0 <= endCol < 8):
-                    endPiece = self.board[endRow][endCol]
-                    if endPiece == '--':
-                        moves.append(Move((r, c), (endRow, endCol), self.board))
-                    elif endPiece[0] == enemyColor:
-                        moves.append(Move((r, c), (endRow, endCol), self.board))
-                        break
-                    else:
-                        break
+        board = self.board
+        base = r * 8 + c | PIECE_CODES[board[r][c]] << 12
+        rays = RAY_TARGETS[r * 8 + c]
+        for j in directions:
+            if pinDirection is not None:
+                d = DIRECTIONS[j]
+                if pinDirection != d and pinDirection != (-d[0], -d[1]):
+                    continue
+            for endRow, endCol, endSq in rays[j]:
+                endPiece = board[endRow][endCol]
+                if endPiece == '--':
+                    moves.append(Move.from_code(base | endSq << 6))
                 else:
+                    if endPiece[0] == enemyColor:
+                        moves.append(Move.from_code(base | endSq << 6 | PIECE_CODES[endPiece] << 16))
                     break
 
     def get_knight_moves(self, r, c, moves):
@@ -336,18 +892,18 @@ class GameState:
         - c: The column of the knight.
         - moves: A list to append the generated moves to.
 
-        This method generates all possible moves for a knight at the specified square.
+        This method generates all possible moves for a knight at the specified square. A pinned knight cannot move.
         """
 
-        knightMoves = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+        if (r, c) in self.pins:
+            return
         allyColor = 'w' if self.whiteToMove else 'b'
-        for m in knightMoves:
-            endRow = r + m[0]
-            endCol = c + m[1]
-            if 0 <= endRow < 8 and 0 <= endCol < 8:
-                endPiece = self.board[endRow][endCol]
-                if endPiece[0] != allyColor:
-                    moves.append(Move((r, c), (endRow, endCol), self.board))
+        board = self.board
+        base = r * 8 + c | PIECE_CODES[board[r][c]] << 12
+        for endRow, endCol, endSq in KNIGHT_TARGETS[r * 8 + c]:
+            endPiece = board[endRow][endCol]
+            if endPiece[0] != allyColor:
+                moves.append(Move.from_code(base | endSq << 6 | PIECE_CODES[endPiece] << 16))
 
     def get_bishop_moves(self, r, c, moves):
         """
@@ -361,23 +917,7 @@ class GameState:
         This method generates all possible moves for a bishop at the specified square.
         """
 
-        direction = ((-1, -1), (-1, 1), (1, -1), (1, 1))
-        enemyColor = 'b' if self.whiteToMove else 'w'
-        for d in direction:
-            for i in range(1, 8):
-                endRow = r + d[0] * i
-                endCol = c + d[1] * i
-                if 0 <= endRow < 8 and 0 <= endCol < 8:
-                    endPiece = self.board[endRow][endCol]
-                    if endPiece == '--':
-                        moves.append(Move((r, c), (endRow, endCol), self.board))
-                    elif endPiece[0] == enemyColor:
-                        moves.append(Move((r, c), (endRow, endCol), self.board))
-                        break
-                    else:
-                        break
-                else:
-                    break
+        self.get_sliding_moves(r, c, BISHOP_DIRECTIONS, moves)
 
     def get_queen_moves(self, r, c, moves):
         """
@@ -403,18 +943,16 @@ class GameState:
         - c: The column of the king.
         - moves: A list to append the generated moves to.
 
-        This method generates all possible moves for a king at the specified square.
+        This method generates the moves of the king to squares where it would not be in check.
         """
 
-        kingMoves = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
         allyColor = 'w' if self.whiteToMove else 'b'
-        for i in range(8):
-            endRow = r + kingMoves[i][0]
-            endCol = c + kingMoves[i][1]
-            if 0 <= endRow < 8 and 0 <= endCol < 8:
-                endPiece = self.board[endRow][endCol]
-                if endPiece[0] != allyColor:
-                    moves.append(Move((r, c), (endRow, endCol), self.board))
+        board = self.board
+        base = r * 8 + c | PIECE_CODES[board[r][c]] << 12
+        for endRow, endCol, endSq in KING_TARGETS[r * 8 + c]:
+            endPiece = board[endRow][endCol]
+            if endPiece[0] != allyColor and not self.square_under_attack(endRow, endCol):
+                moves.append(Move.from_code(base | endSq << 6 | PIECE_CODES[endPiece] << 16))
 
     def get_castle_moves(self, r, c, moves):
         """
@@ -428,24 +966,22 @@ class GameState:
         This method generates all possible castle moves for a king at the specified square.
         """
 
-        if self.square_under_attack(r, c):
+        if self.inCheck:
             return
-        if (self.whiteToMove and self.currentCastlingRights.wks) or (
-                not self.whiteToMove and self.currentCastlingRights.bks):
+        if self.castlingRights & (CASTLE_WKS if self.whiteToMove else CASTLE_BKS):
             self.get_king_side_castle_moves(r, c, moves)
-        if (self.whiteToMove and self.currentCastlingRights.wqs) or (
-                not self.whiteToMove and self.currentCastlingRights.bqs):
+        if self.castlingRights & (CASTLE_WQS if self.whiteToMove else CASTLE_BQS):
             self.get_queen_side_castle_moves(r, c, moves)
 
     def get_king_side_castle_moves(self, r, c, moves):
         if self.board[r][c + 1] == '--' and self.board[r][c + 2] == '--':
             if not self.square_under_attack(r, c + 1) and not self.square_under_attack(r, c + 2):
-                moves.append(Move((r, c), (r, c + 2), self.board, isCastleMove=True))
+                moves.append(Move((r, c), (r, c + 2), self.board[r][c], isCastleMove=True))
 
     def get_queen_side_castle_moves(self, r, c, moves):
         if self.board[r][c - 1] == '--' and self.board[r][c - 2] == '--' and self.board[r][c - 3] == '--':
             if not self.square_under_attack(r, c - 1) and not self.square_under_attack(r, c - 2):
-                moves.append(Move((r, c), (r, c - 2), self.board, isCastleMove=True))
+                moves.append(Move((r, c), (r, c - 2), self.board[r][c], isCastleMove=True))
 
 
 class CastleRights:
@@ -465,39 +1001,132 @@ class CastleRights:
         self.bks = bks
         self.bqs = bqs
 
+    @classmethod
+    def from_mask(cls, mask):
+        """
+        Create castling rights from a mask of CASTLE_* flags.
+
+        Args:
+        - mask: The castling rights mask.
+        """
+
+        return cls(bool(mask & CASTLE_WKS), bool(mask & CASTLE_BKS), bool(mask & CASTLE_WQS), bool(mask & CASTLE_BQS))
+
+    def to_mask(self):
+        """
+        Get the castling rights as a mask of CASTLE_* flags.
+        """
+
+        return ((CASTLE_WKS if self.wks else 0) | (CASTLE_WQS if self.wqs else 0) |
+                (CASTLE_BKS if self.bks else 0) | (CASTLE_BQS if self.bqs else 0))
+
 
 class Move:
+    """
+    A chess move packed into a single integer.
+
+    Bits of code, from the lowest:
+    - 0-5: Starting square (row * 8 + col).
+    - 6-11: Ending square.
+    - 12-15: Piece moved, as an index into PIECE_NAMES.
+    - 16-19: Piece captured, as an index into PIECE_NAMES.
+    - 20-22: En passant, castle and pawn promotion flags.
+    - 23-25: Promotion piece as an index into PROMOTION_PIECES; 0 means GameState.promotionChoice is used.
+    """
+
+    __slots__ = ('code',)
+
     ranksToRows = {"1": 7, "2": 6, "3": 5, "4": 4,
                    "5": 3, "6": 2, "7": 1, "8": 0}
     rowsToRanks = {v: k for k, v in ranksToRows.items()}
     filesToCols = dict(a=0, b=1, c=2, d=3, e=4, f=5, g=6, h=7)
     colsToFiles = {v: k for k, v in filesToCols.items()}
 
-    def __init__(self, startSq, endSq, board, isEnpassantMove=False, isCastleMove=False):
+    def __init__(self, startSq, endSq, pieceMoved='--', pieceCaptured='--', isEnpassantMove=False,
+                 isCastleMove=False, promotionPiece=''):
         """
         Create a Move object representing a chess move.
 
         Args:
         - startSq: Tuple representing the starting square of the move.
         - endSq: Tuple representing the ending square of the move.
-        - board: The current chessboard state.
+        - pieceMoved: The piece being moved, e.g. 'wP'. Can be left out for moves only used for comparison.
+        - pieceCaptured: The piece on the ending square, '--' if none.
+        - isEnpassantMove: Boolean flag indicating if the move is an en passant capture.
+        - isCastleMove: Boolean flag indicating if the move is a castling move.
+        - promotionPiece: The piece a pawn promotes to ('Q', 'R', 'B' or 'N'), '' to use the game's choice.
 
-        This constructor initializes a Move object with the provided information.
+        This constructor packs the provided information into the move code; the board is not needed.
         """
 
-        self.startRow = startSq[0]
-        self.startCol = startSq[1]
-        self.endRow = endSq[0]
-        self.endCol = endSq[1]
-        self.pieceMoved = board[self.startRow][self.startCol]
-        self.pieceCaptured = board[self.endRow][self.endCol]
-        self.isPawnPromotion = (self.pieceMoved == 'wP' and self.endRow == 0) or (
-                self.pieceMoved == 'bP' and self.endRow == 7)
-        self.isEnpassantMove = isEnpassantMove
-        if self.isEnpassantMove:
-            self.pieceCaptured = 'wP' if self.pieceMoved == 'bP' else 'bP'
-        self.isCastleMove = isCastleMove
-        self.moveID = self.startRow * 1000 + self.startCol * 100 + self.endRow * 10 + self.endCol
+        startRow, startCol = startSq
+        endRow, endCol = endSq
+        code = startRow * 8 + startCol | (endRow * 8 + endCol) << 6 | PIECE_CODES[pieceMoved] << 12
+        if isEnpassantMove:
+            pieceCaptured = 'wP' if pieceMoved == 'bP' else 'bP'
+            code |= MOVE_ENPASSANT
+        if isCastleMove:
+            code |= MOVE_CASTLE
+        if (pieceMoved == 'wP' and endRow == 0) or (pieceMoved == 'bP' and endRow == 7):
+            code |= MOVE_PROMOTION | PROMOTION_PIECES.index(promotionPiece) << 23
+        self.code = code | PIECE_CODES[pieceCaptured] << 16
+
+    @classmethod
+    def from_code(cls, code):
+        """
+        Create a Move object from an already packed move code.
+
+        Args:
+        - code: The packed move code.
+        """
+
+        move = cls.__new__(cls)
+        move.code = code
+        return move
+
+    @property
+    def startRow(self):
+        return (self.code & 63) >> 3
+
+    @property
+    def startCol(self):
+        return self.code & 7
+
+    @property
+    def endRow(self):
+        return (self.code >> 9) & 7
+
+    @property
+    def endCol(self):
+        return (self.code >> 6) & 7
+
+    @property
+    def pieceMoved(self):
+        return PIECE_NAMES[(self.code >> 12) & 15]
+
+    @property
+    def pieceCaptured(self):
+        return PIECE_NAMES[(self.code >> 16) & 15]
+
+    @property
+    def isEnpassantMove(self):
+        return (self.code & MOVE_ENPASSANT) != 0
+
+    @property
+    def isCastleMove(self):
+        return (self.code & MOVE_CASTLE) != 0
+
+    @property
+    def isPawnPromotion(self):
+        return (self.code & MOVE_PROMOTION) != 0
+
+    @property
+    def promotionPiece(self):
+        return PROMOTION_PIECES[(self.code >> 23) & 7]
+
+    @property
+    def moveID(self):
+        return self.code & 4095
 
     def __eq__(self, other):
         """
@@ -509,13 +1138,16 @@ class Move:
         Returns:
         True if the moves are equal, False otherwise.
 
-        This method compares two Move objects based on their move IDs.
+        This method compares two Move objects based on their move IDs (starting and ending squares).
         """
 
         if isinstance(other, Move):
-            return self.moveID == other.moveID
+            return (self.code & 4095) == (other.code & 4095)
         return False
 
+    def __hash__(self):
+        return self.code & 4095
+
     def get_chess_notation(self):
         """
         Get the standard algebraic notation (SAN) for the move.
@@ -0,0 +1,139 @@
+"""
+Evaluation Script
+"""
+
+from itertools import chain
+
+# Material values in centipawns for the middlegame (MG) and the endgame (EG).
+MATERIAL_MG = {'P': 100, 'N': 320, 'B': 330, 'R': 500, 'Q': 900, 'K': 0}
+MATERIAL_EG = {'P': 120, 'N': 300, 'B': 320, 'R': 520, 'Q': 920, 'K': 0}
+# Contribution of each piece to the game phase: MAX_PHASE with all pieces on the board, 0 with only Kings and pawns.
+PHASE_WEIGHTS = {'P': 0, 'N': 1, 'B': 1, 'R': 2, 'Q': 4, 'K': 0}
+MAX_PHASE = 24
+
+# Piece-square bonuses from White's point of view, indexed by square (row * 8 + col, a8 first). Black pieces use the
+# mirrored square (sq ^ 56).
+PIECE_SQUARE_MG = {
+    'P': (0, 0, 0, 0, 0, 0, 0, 0,
+          50, 50, 50, 50, 50, 50, 50, 50,
+          10, 10, 20, 30, 30, 20, 10, 10,
+          5, 5, 10, 25, 25, 10, 5, 5,
+          0, 0, 0, 20, 20, 0, 0, 0,
+          5, -5, -10, 0, 0, -10, -5, 5,
+          5, 10, 10, -20, -20, 10, 10, 5,
+          0, 0, 0, 0, 0, 0, 0, 0),
+    'N': (-50, -40, -30, -30, -30, -30, -40, -50,
+          -40, -20, 0, 0, 0, 0, -20, -40,
+          -30, 0, 10, 15, 15, 10, 0, -30,
+          -30, 5, 15, 20, 20, 15, 5, -30,
+          -30, 0, 15, 20, 20, 15, 0, -30,
+          -30, 5, 10, 15, 15, 10, 5, -30,
+          -40, -20, 0, 5, 5, 0, -20, -40,
+          -50, -40, -30, -30, -30, -30, -40, -50),
+    'B': (-20, -10, -10, -10, -10, -10, -10, -20,
+          -10, 0, 0, 0, 0, 0, 0, -10,
+          -10, 0, 5, 10, 10, 5, 0, -10,
+          -10, 5, 5, 10, 10, 5, 5, -10,
+          -10, 0, 10, 10, 10, 10, 0, -10,
+          -10, 10, 10, 10, 10, 10, 10, -10,
+          -10, 5, 0, 0, 0, 0, 5, -10,
+          -20, -10, -10, -10, -10, -10, -10, -20),
+    'R': (0, 0, 0, 0, 0, 0, 0, 0,
+          5, 10, 10, 10, 10, 10, 10, 5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          -5, 0, 0, 0, 0, 0, 0, -5,
+          0, 0, 0, 5, 5, 0, 0, 0),
+    'Q': (-20, -10, -10, -5, -5, -10, -10, -20,
+          -10, 0, 0, 0, 0, 0, 0, -10,
+          -10, 0, 5, 5, 5, 5, 0, -10,
+          -5, 0, 5, 5, 5, 5, 0, -5,
+          0, 0, 5, 5, 5, 5, 0, -5,
+          -10, 5, 5, 5, 5, 5, 0, -10,
+          -10, 0, 5, 0, 0, 0, 0, -10,
+          -20, -10, -10, -5, -5, -10, -10, -20),
+    'K': (-30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -30, -40, -40, -50, -50, -40, -40, -30,
+          -20, -30, -30, -40, -40, -30, -30, -20,
+          -10, -20, -20, -20, -20, -20, -20, -10,
+          20, 20, 0, 0, 0, 0, 20, 20,
+          20, 30, 10, 0, 0, 10, 30, 20),
+}
+
+# In the endgame passed pawns matter more the further they are, and the King belongs in the centre.
+PIECE_SQUARE_EG = dict(PIECE_SQUARE_MG)
+PIECE_SQUARE_EG['P'] = (0, 0, 0, 0, 0, 0, 0, 0,
+                        80, 80, 80, 80, 80, 80, 80, 80,
+                        50, 50, 50, 50, 50, 50, 50, 50,
+                        30, 30, 30, 30, 30, 30, 30, 30,
+                        15, 15, 15, 15, 15, 15, 15, 15,
+                        5, 5, 5, 5, 5, 5, 5, 5,
+                        0, 0, 0, 0, 0, 0, 0, 0,
+                        0, 0, 0, 0, 0, 0, 0, 0)
+PIECE_SQUARE_EG['K'] = (-50, -40, -30, -20, -20, -30, -40, -50,
+                        -30, -20, -10, 0, 0, -10, -20, -30,
+                        -30, -10, 20, 30, 30, 20, -10, -30,
+                        -30, -10, 30, 40, 40, 30, -10, -30,
+                        -30, -10, 30, 40, 40, 30, -10, -30,
+                        -30, -10, 20, 30, 30, 20, -10, -30,
+                        -30, -30, 0, 0, 0, 0, -30, -30,
+                        -50, -30, -30, -30, -30, -30, -30, -50)
+
+
+def _build_eval_table(material, pieceSquare):
+    table = {}
+    for piece in 'PNBRQK':
+        table['w' + piece] = [material[piece] + pieceSquare[piece][sq] for sq in range(64)]
+        table['b' + piece] = [-(material[piece] + pieceSquare[piece][sq ^ 56]) for sq in range(64)]
+    return table
+
+
+# EVAL_MG[piece][sq] is the material and piece-square score of a piece on a square, from White's point of view (so
+# negative for Black pieces). GameState adds and subtracts these as pieces move.
+EVAL_MG = _build_eval_table(MATERIAL_MG, PIECE_SQUARE_MG)
+EVAL_EG = _build_eval_table(MATERIAL_EG, PIECE_SQUARE_EG)
+PHASE = {color + piece: weight for color in 'wb' for piece, weight in PHASE_WEIGHTS.items()}
+
+
+def compute_evaluation(board):
+    """
+    Compute the evaluation terms of a position from scratch.
+
+    Args:
+    - board: The chessboard represented as a 2D list.
+
+    Returns:
+    A tuple (mgScore, egScore, phase): the middlegame and endgame scores from White's point of view and the game
+    phase.
+    """
+
+    mgScore = egScore = phase = 0
+    for sq, piece in enumerate(chain.from_iterable(board)):
+        if piece != '--':
+            mgScore += EVAL_MG[piece][sq]
+            egScore += EVAL_EG[piece][sq]
+            phase += PHASE[piece]
+    return mgScore, egScore, phase
+
+
+def taper(mgScore, egScore, phase):
+    """
+    Blend the middlegame and endgame scores by the game phase.
+
+    Args:
+    - mgScore: The middlegame score.
+    - egScore: The endgame score.
+    - phase: The game phase, MAX_PHASE for the opening position (more after promotions).
+
+    Returns:
+    The blended score.
+    """
+
+    phase = min(phase, MAX_PHASE)
+    score = mgScore * phase + egScore * (MAX_PHASE - phase)
+    # Round towards zero so that mirrored positions get exactly opposite scores.
+    return score // MAX_PHASE if score >= 0 else -(-score // MAX_PHASE)
@@ -3,20 +3,12 @@ Main Script
 """
 
 # Imports
-import json
 import os
 import random
 import sys
-import tkinter as t
-import webbrowser
-from tkinter import ttk
-
-import ntkutils
-import pygame as p
-from pypresence import Presence
-from tkmessagebox import *
 
 import ChessEngine
+import ChessPresence
 
 # Constants
 BOARD_WIDTH = BOARD_HEIGHT = 784
@@ -26,33 +18,108 @@ DIMENSION = 8
 SQ_SIZE = BOARD_HEIGHT // DIMENSION
 MAX_FPS = 15
 IMAGES = {}
-WINDOW_ICON = p.image.load('images/GAME/icon.png')
+# Board and highlight surfaces, drawn once and reused on every frame.
+BOARD_SURFACES = {}
+HIGHLIGHTS = {}
+WINDOW_ICON_PATH = 'images/GAME/icon.png'
+TK_THEME_PATH = './images/THEME/sun-valley.tcl'
 ANIMATE = True
-SCROLL_OFFSET = 1
 SCROLL_SPEED = 1
 FRAMES_PER_SQUARE = 9
+# Frame rate of the game loop while a move is animated. A move takes FRAMES_PER_SQUARE frames at this rate per square,
+# however long the frames take to draw.
+ANIMATION_FPS = 60
 PRACTICE_MODE = False
+PLAY_VS_COMPUTER = False
+COMPUTER_THINK_TIME_MS = 1000
+TRANSPOSITION_TABLE_MB = 16
+COMPUTER_SEARCH_WORKERS = 1
+OPENING_BOOK_PATH = 'book.bin'
+TABLEBASE_DIR = 'tablebases'
+HINT_THINK_TIME_MS = 500
 SKIN = 'Default'
 THEME = 'Default'
 COLORS = 0
+THEME_COLORS = {
+    'Default': ((240, 217, 181), (181, 136, 99)),
+    'Dark': ((150, 150, 150), (50, 50, 50)),
+    'Green': ((238, 238, 210), (118, 150, 86)),
+}
 MOVES_LOG = []
 PROMOTION_PIECE = 'Queen'
 CLIENT_ID = '1187143441830912150'
 DRP = True
-RPC = Presence(CLIENT_ID)
+# Seconds to wait for Discord before giving up on Rich Presence.
+RPC_CONNECT_TIMEOUT = 2
+# The ChessPresence.PresenceWorker sending the Discord Rich Presence updates, set by start_presence.
+RPC = None
+# The GUI libraries, imported by load_pygame and load_tk when first needed, so that importing this module stays fast.
+p = t = ttk = messagebox = ntkutils = Image = ImageTk = None
+
+
+def load_pygame():
+    """
+    Import pygame, on first use rather than with the module, as it makes up most of the import time.
+    """
+
+    global p
+    if p is None:
+        import pygame as p
+
+
+def load_tk():
+    """
+    Import tkinter and the Tk helpers, the first time a Tk window is opened.
+    """
+
+    global t, ttk, messagebox, ntkutils, Image, ImageTk
+    if t is not None:
+        return
+    import ntkutils
+    from PIL import Image, ImageTk
+    from tkinter import messagebox, ttk
+    import tkinter as t
+
+
+def start_presence():
+    """
+    Start the Discord Rich Presence worker, which connects and sends the updates on a background thread.
+
+    Returns:
+    The ChessPresence.PresenceWorker, also stored in RPC.
+
+    The game loop only hands the latest state to the worker, so it never waits for Discord, even when Discord is not
+    running or the connection is lost.
+    """
 
-try:
-    RPC.connect()
-except Exception as ex:
-    print(f"Error connecting to Discord RPC: {ex}")
-    DRP = False
+    def connect():
+        import asyncio
+        from pypresence import Presence
+        # The client's event loop is only used by the worker thread, which makes every call to Discord.
+        rpc = Presence(CLIENT_ID, loop=asyncio.new_event_loop(), connection_timeout=RPC_CONNECT_TIMEOUT)
+        rpc.connect()
+        return rpc
 
-if DRP:
+    global RPC
+    RPC = ChessPresence.PresenceWorker(connect).start()
     RPC.update(
         details="Playing Good Chess",
         small_image="icon",
         buttons=[{"label": "⭐ Github", "url": "https://github.com/t0ry003/GoodChess"}]
     )
+    return RPC
+
+
+def apply_tk_theme(root):
+    """
+    Apply the dark Sun Valley theme to a Tk window.
+
+    Args:
+    - root: The Tk window.
+    """
+
+    root.tk.call('source', TK_THEME_PATH)
+    root.tk.call('set_theme', 'dark')
 
 
 def menu():
@@ -66,6 +133,7 @@ def menu():
     """
 
     def load_chess_data(file_path):
+        import json
         with open(file_path, 'r') as file:
             chess_data = json.load(file)
         return chess_data
@@ -73,7 +141,7 @@ def menu():
     def show_last_moves():
         file_path = ".moves_log.json"
         if not os.path.isfile(file_path):
-            showerror("ERROR", "No data to show.")
+            messagebox.showerror("ERROR", "No data to show.")
             return
 
         chess_data = load_chess_data(file_path)
@@ -83,19 +151,16 @@ def menu():
             print("Error loading chess data from the file or no data to show.")
 
     def apply_selection():
-        global SKIN, THEME, COLORS, FRAMES_PER_SQUARE, PRACTICE_MODE
+        global SKIN, THEME, COLORS, FRAMES_PER_SQUARE, PRACTICE_MODE, PLAY_VS_COMPUTER
         SKIN = skin_combo.get()
         THEME = theme_combo.get()
 
-        if THEME == 'Default':
-            COLORS = [p.Color(240, 217, 181), p.Color(181, 136, 99)]
-        elif THEME == 'Dark':
-            COLORS = [p.Color(150, 150, 150), p.Color(50, 50, 50)]
-        elif THEME == 'Green':
-            COLORS = [p.Color(238, 238, 210), p.Color(118, 150, 86)]
+        if THEME in THEME_COLORS:
+            COLORS = [p.Color(*color) for color in THEME_COLORS[THEME]]
 
         FRAMES_PER_SQUARE = int(anim_combo.get()[0])
         PRACTICE_MODE = var_practice_mode.get()
+        PLAY_VS_COMPUTER = var_play_vs_computer.get()
 
         save_settings_to_cfg()
 
@@ -107,6 +172,7 @@ def menu():
         root.quit()
 
     def open_github():
+        import webbrowser
         webbrowser.open("https://github.com/t0ry003/GoodChess")
 
     def show_chess_data(chess_data):
@@ -143,7 +209,8 @@ def menu():
 
         top.mainloop()
 
-    global SKIN, THEME, COLORS, FRAMES_PER_SQUARE, PRACTICE_MODE
+    global SKIN, THEME, COLORS, FRAMES_PER_SQUARE, PRACTICE_MODE, PLAY_VS_COMPUTER
+    load_tk()
     root = t.Tk()
     ntkutils.dark_title_bar(root)
 
@@ -179,6 +246,11 @@ def menu():
         var_practice_mode = t.IntVar(value=1)
     practice_mode_checkbox = ttk.Checkbutton(root, text="Practice Mode", variable=var_practice_mode)
 
+    var_play_vs_computer = t.IntVar(value=0)
+    if PLAY_VS_COMPUTER == '1':
+        var_play_vs_computer = t.IntVar(value=1)
+    play_vs_computer_checkbox = ttk.Checkbutton(root, text="Play vs Computer", variable=var_play_vs_computer)
+
     logo_label = ttk.Label(root, image=main_logo)
 
     apply_button = ttk.Button(root, command=apply_selection, image=play_icon)
@@ -194,12 +266,12 @@ def menu():
     anim_label.pack(pady=0)
     anim_combo.pack(pady=10)
     practice_mode_checkbox.pack(pady=10)
+    play_vs_computer_checkbox.pack(pady=0)
     apply_button.pack(pady=20)
     show_moves_button.pack(pady=10)
     github_button.pack(side=t.LEFT, padx=10, pady=10)
 
-    root.tk.call('source', './images/THEME/sun-valley.tcl')
-    root.tk.call('set_theme', 'dark')
+    apply_tk_theme(root)
     root.protocol("WM_DELETE_WINDOW", shutdown_ttk_repeat)
     root.mainloop()
 
@@ -224,11 +296,11 @@ def ask_pawn_promotion():
         popup.quit()
 
     global PROMOTION_PIECE
+    load_tk()
     popup = t.Tk()
     ntkutils.dark_title_bar(popup)
 
-    popup.tk.call('source', './images/THEME/sun-valley.tcl')
-    popup.tk.call('set_theme', 'dark')
+    apply_tk_theme(popup)
 
     popup.title("Pawn Promotion")
     popup.iconbitmap("images/GAME/icon.ico")
@@ -269,161 +341,58 @@ def load_images():
                                           (SQ_SIZE, SQ_SIZE))
 
 
-def highlight_squares(screen, gs, validMoves, sqSelected):
+def square_highlights(gs, validMoves, sqSelected):
     """
-    Highlight valid moves on the chessboard.
+    Get the highlighted squares.
 
     Args:
-    - screen: The Pygame display surface.
     - gs: The current game state.
     - validMoves: List of valid moves.
     - sqSelected: The selected square.
 
-    This function highlights the selected square and valid moves on the chessboard.
+    Returns:
+    A dictionary of the highlight color of each highlighted (row, col): red or blue for the selected piece, depending on
+    whether the King is in check, and yellow for the squares it can move to.
     """
 
+    highlights = {}
     if sqSelected != ():
         r, c = sqSelected
         if gs.board[r][c][0] == ('w' if gs.whiteToMove else 'b'):
-            s = p.Surface((SQ_SIZE, SQ_SIZE))
-            s.set_alpha(130)
-
-            if gs.in_check():
-                s.fill(p.Color('red'))
-                screen.blit(s, (SQ_SIZE * c, SQ_SIZE * r))
-            else:
-                s.fill(p.Color('blue'))
-                screen.blit(s, (SQ_SIZE * c, SQ_SIZE * r))
-
-            s.fill(p.Color('yellow'))
+            highlights[(r, c)] = 'red' if gs.in_check() else 'blue'
             for move in validMoves:
                 if move.startRow == r and move.startCol == c:
-                    screen.blit(s, (move.endCol * SQ_SIZE, move.endRow * SQ_SIZE))
-
+                    highlights[(move.endRow, move.endCol)] = 'yellow'
+    return highlights
 
-def draw_game_state(screen, gs, validMoves, sqSelected, moveLogFont):
-    """
-    Draw the current state of the chessboard.
-
-    Args:
-    - screen: The Pygame display surface.
-    - gs: The current game state.
-    - validMoves: List of valid moves.
-    - sqSelected: The selected square.
-    - moveLogFont: Pygame font for the move log.
-
-    This function draws the chessboard, pieces, and move log on the screen based on the provided parameters.
-    """
-
-    draw_board(screen)
-    highlight_squares(screen, gs, validMoves, sqSelected)
-    draw_pieces(screen, gs.board)
-    draw_move_log(screen, gs, moveLogFont)
-
-
-def draw_board(screen):
-    """
-    Draw the chessboard grid on the screen.
-
-    Args:
-    - screen: The Pygame display surface.
 
-    This function draws the grid of the chessboard on the provided Pygame display surface.
+def highlight_surface(color):
     """
-
-    global COLORS
-    for r in range(DIMENSION):
-        for c in range(DIMENSION):
-            color = COLORS[((r + c) % 2)]
-            p.draw.rect(screen, color, p.Rect(c * SQ_SIZE, r * SQ_SIZE, SQ_SIZE, SQ_SIZE))
-
-
-def draw_pieces(screen, board):
-    """
-    Draw the chess pieces on the chessboard.
-
-    Args:
-    - screen: The Pygame display surface.
-    - board: The current chessboard state.
-
-    This function draws the chess pieces on the chessboard based on the provided board state.
+    Get the translucent square drawn over a highlighted square, created once per color.
     """
 
-    for r in range(DIMENSION):
-        for c in range(DIMENSION):
-            piece = board[r][c]
-            if piece != "--":
-                screen.blit(IMAGES[piece], p.Rect(c * SQ_SIZE, r * SQ_SIZE, SQ_SIZE, SQ_SIZE))
+    surface = HIGHLIGHTS.get(color)
+    if surface is None:
+        surface = HIGHLIGHTS[color] = p.Surface((SQ_SIZE, SQ_SIZE))
+        surface.set_alpha(130)
+        surface.fill(p.Color(color))
+    return surface
 
 
-def draw_move_log(screen, gs, font):
+def board_surface():
     """
-    Draw the move log on the right side of the chessboard.
-
-    Args:
-    - screen: The Pygame display surface.
-    - gs: The current game state.
-    - font: Pygame font for the move log.
-
-    This function draws the move log on the right side of the chessboard.
+    Get the empty board in the current colors, drawn once per color scheme.
     """
 
-    global SCROLL_OFFSET, MOVES_LOG
-    moveLogRect = p.Rect(BOARD_WIDTH, 0, MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT)
-    p.draw.rect(screen, p.Color('black'), moveLogRect)
-    moveLog = gs.moveLog
-    moveTexts = moveLog
-    padding = 5
-    textY = padding - SCROLL_OFFSET
-    lineSpacing = 2
-    visible_lines = MOVE_LOG_PANEL_HEIGHT // (font.get_height() + lineSpacing)
-
-    for i in range(len(moveTexts)):
-        move_number = i + 1
-        text = f"{move_number}. {moveTexts[i].get_chess_notation()}"
-        textObject = font.render(text, True, p.Color('white'))
-        textLocation = moveLogRect.move(padding, textY)
-        screen.blit(textObject, textLocation)
-        textY += textObject.get_height() + lineSpacing
-
-        if i >= len(MOVES_LOG):
-            MOVES_LOG.append(moveTexts[i].get_chess_notation())
-
-    if len(moveTexts) > visible_lines:
-        SCROLL_OFFSET += SCROLL_SPEED
-        if SCROLL_OFFSET > (len(moveTexts) - visible_lines) * (font.get_height() + lineSpacing):
-            SCROLL_OFFSET = 0
-
-
-def animate_move(move, screen, board, clock):
-    """
-    Animate a chess move on the chessboard.
-
-    Args:
-    - move: The move to animate.
-    - screen: The Pygame display surface.
-    - board: The current chessboard state.
-    - clock: Pygame clock for controlling animation speed.
-
-    This function animates a chess move on the chessboard, updating the screen and clock accordingly.
-    """
-
-    global COLORS, FRAMES_PER_SQUARE
-    dR = move.endRow - move.startRow
-    dC = move.endCol - move.startCol
-    frameCount = (abs(dR) + abs(dC)) * FRAMES_PER_SQUARE
-    for frame in range(frameCount + 1):
-        r, c = (move.startRow + dR * frame / frameCount, move.startCol + dC * frame / frameCount)
-        draw_board(screen)
-        draw_pieces(screen, board)
-        color = COLORS[(move.endRow + move.endCol) % 2]
-        endSquare = p.Rect(move.endCol * SQ_SIZE, move.endRow * SQ_SIZE, SQ_SIZE, SQ_SIZE)
-        p.draw.rect(screen, color, endSquare)
-        if move.pieceCaptured != '--':
-            screen.blit(IMAGES[move.pieceCaptured], endSquare)
-        screen.blit(IMAGES[move.pieceMoved], p.Rect(c * SQ_SIZE, r * SQ_SIZE, SQ_SIZE, SQ_SIZE))
-        p.display.flip()
-        clock.tick(60)
+    key = tuple(tuple(color) for color in COLORS)
+    surface = BOARD_SURFACES.get(key)
+    if surface is None:
+        surface = BOARD_SURFACES[key] = p.Surface((BOARD_WIDTH, BOARD_HEIGHT))
+        for r in range(DIMENSION):
+            for c in range(DIMENSION):
+                color = COLORS[((r + c) % 2)]
+                p.draw.rect(surface, color, p.Rect(c * SQ_SIZE, r * SQ_SIZE, SQ_SIZE, SQ_SIZE))
+    return surface
 
 
 def draw_text(screen, text, font_size=60, font_color='Black', shadow_color='White'):
@@ -454,6 +423,231 @@ def draw_text(screen, text, font_size=60, font_color='Black', shadow_color='Whit
     screen.blit(textObject, shadow_location)
 
 
+class MoveLogView:
+    """
+    The move log panel. The text of each move is rendered once, and a frame only copies the lines inside the panel.
+
+    Attributes:
+    - font: Pygame font for the move log.
+    - moves: The moves of the game, as last synced.
+    - notations: The notation of each move, e.g. for save_moves_to_json.
+    - lines: The rendered text of each move.
+    - lineHeight: Height of a line, with its spacing.
+    - visibleLines: Number of whole lines the panel shows.
+    - scrollOffset: Pixels the lines are scrolled up by. When the log is longer than the panel, it scrolls a little on
+      every frame and starts over at the top after the last move.
+    - changed: True when the lines changed since the panel was last drawn.
+
+    The visible lines are kept in a strip one line taller than the panel, which scrolls by drawing it at an offset and
+    is only rebuilt when a line scrolls out of it. The cost of a frame therefore does not grow with the game.
+    """
+
+    padding = 5
+    lineSpacing = 2
+
+    def __init__(self, font):
+        self.font = font
+        self.moves = []
+        self.notations = []
+        self.lines = []
+        self.lineHeight = font.get_height() + self.lineSpacing
+        self.visibleLines = MOVE_LOG_PANEL_HEIGHT // self.lineHeight
+        self.scrollOffset = 0
+        self.changed = True
+        self._strip = p.Surface((MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT + self.lineHeight))
+        self._stripFirst = None
+
+    @property
+    def scrolling(self):
+        return len(self.lines) > self.visibleLines
+
+    def sync(self, moveLog):
+        """
+        Bring the lines in line with the game's move log, after moves, undos or a reset.
+
+        Args:
+        - moveLog: The move log of the game state.
+
+        Moves are compared by identity from the end, so that an unchanged log costs one comparison: only the moves
+        after the last one still in the log are rendered again.
+        """
+
+        kept = min(len(self.moves), len(moveLog))
+        while kept and self.moves[kept - 1] is not moveLog[kept - 1]:
+            kept -= 1
+        if kept == len(self.moves) == len(moveLog):
+            return
+        del self.moves[kept:], self.notations[kept:], self.lines[kept:]
+        for move in moveLog[kept:]:
+            notation = move.get_chess_notation()
+            self.moves.append(move)
+            self.notations.append(notation)
+            self.lines.append(self.font.render(f"{len(self.lines) + 1}. {notation}", True, p.Color('white')))
+        if not self.scrolling:
+            self.scrollOffset = 0
+        self._stripFirst = None
+        self.changed = True
+
+    def draw(self, screen):
+        """
+        Draw the move log on the right side of the chessboard.
+
+        Args:
+        - screen: The Pygame display surface.
+
+        Returns:
+        True if the log is longer than the panel, which then scrolls a little on every frame.
+        """
+
+        first = self.scrollOffset // self.lineHeight
+        if first != self._stripFirst:
+            # The line before the first one may show its last pixels above it.
+            self._strip.fill(p.Color('black'))
+            for i in range(max(first - 1, 0), min(first + self.visibleLines + 2, len(self.lines))):
+                self._strip.blit(self.lines[i], (self.padding, self.padding + (i - first) * self.lineHeight))
+            self._stripFirst = first
+        screen.blit(self._strip, (BOARD_WIDTH, 0),
+                    p.Rect(0, self.scrollOffset - first * self.lineHeight, MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT))
+        self.changed = False
+
+        if self.scrolling:
+            self.scrollOffset += SCROLL_SPEED
+            if self.scrollOffset > (len(self.lines) - self.visibleLines) * self.lineHeight:
+                self.scrollOffset = 0
+            return True
+        return False
+
+
+class BoardRenderer:
+    """
+    Draws the game window in retained mode: only what changed since the last frame is drawn and sent to the display.
+
+    Attributes:
+    - screen: The Pygame display surface.
+    - moveLog: The MoveLogView of the move log panel.
+    - drawn: For each square (row * 8 + col), the (piece, highlight) drawn on it, or None when it must be redrawn.
+    - overlay: The draw_text arguments of the message drawn over the board, or None.
+    - logDrawn: False when the move log panel must be redrawn.
+    - animation: The move being animated, or None.
+    - animationStart and animationDuration: When the animation started and how long it lasts, in milliseconds.
+    - animationBackground: The board without the moving piece, or None when it must be copied again.
+    - pieceRect: Where the moving piece was drawn, or None.
+
+    An idle frame compares the 64 squares with what was drawn and sends nothing to the display. While a move is
+    animated, its end square is drawn as it was before the move and the board is copied once; each frame then only
+    restores the rectangle the piece was drawn on from the copy and draws the piece at its new place.
+    """
+
+    def __init__(self, screen, moveLog):
+        self.screen = screen
+        self.moveLog = moveLog
+        self.animation = None
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Redraw the whole window on the next frame, e.g. after it was drawn by something else or exposed.
+        """
+
+        self.drawn = [None] * (DIMENSION * DIMENSION)
+        self.overlay = None
+        self.logDrawn = False
+        self.animationBackground = None
+        self.pieceRect = None
+
+    def animate(self, move):
+        """
+        Slide the piece of a move from its start square to its end square over the next frames.
+
+        Args:
+        - move: The move, which must be the last one made.
+
+        The animation lasts FRAMES_PER_SQUARE frames at ANIMATION_FPS per square the piece travels, whatever the frame
+        rate. It is dropped if the move is taken back or the board is reset before it ends.
+        """
+
+        if self.animation is not None:
+            # The piece of the previous move may still be drawn between squares.
+            self.invalidate()
+        self.animation = move
+        self.animationStart = p.time.get_ticks()
+        squares = abs(move.endRow - move.startRow) + abs(move.endCol - move.startCol)
+        self.animationDuration = squares * FRAMES_PER_SQUARE * 1000 / ANIMATION_FPS
+
+    def draw(self, gs, validMoves, sqSelected, overlay=None):
+        """
+        Draw what changed since the last frame.
+
+        Args:
+        - gs: The current game state.
+        - validMoves: List of valid moves.
+        - sqSelected: The selected square.
+        - overlay: The draw_text arguments (text, font_size, font_color, shadow_color) of a message to show over the
+          board, or None.
+
+        Returns:
+        The list of changed rectangles, for p.display.update. Empty when nothing changed.
+        """
+
+        screen = self.screen
+        dirty = []
+        if self.pieceRect is not None:
+            # Clear the moving piece, so that the board can be copied again if squares change under it.
+            screen.blit(self.animationBackground, self.pieceRect, self.pieceRect)
+            dirty.append(self.pieceRect)
+            self.pieceRect = None
+        move = self.animation
+        if move is not None:
+            progress = (p.time.get_ticks() - self.animationStart) / self.animationDuration
+            if progress > 1 or not gs.moveLog or gs.moveLog[-1] is not move:
+                # Over, or the move was taken back: draw the board as it is.
+                move = self.animation = self.animationBackground = None
+
+        highlights = square_highlights(gs, validMoves, sqSelected)
+        states = [(piece, highlights.get((r, c))) for r, row in enumerate(gs.board) for c, piece in enumerate(row)]
+        if move is not None:
+            # The end square as it was before the move, under the moving piece.
+            endSq = move.endRow * DIMENSION + move.endCol
+            captured = '--' if move.isEnpassantMove else move.pieceCaptured
+            states[endSq] = (captured, states[endSq][1])
+        if overlay != self.overlay or (overlay is not None and states != self.drawn):
+            # The message covers several squares: redraw the whole board to add, remove or redraw it.
+            self.drawn = [None] * (DIMENSION * DIMENSION)
+        background = board_surface()
+        cleared = len(dirty)
+        for sq, state in enumerate(states):
+            if self.drawn[sq] != state:
+                rect = p.Rect((sq & 7) * SQ_SIZE, (sq >> 3) * SQ_SIZE, SQ_SIZE, SQ_SIZE)
+                screen.blit(background, rect, rect)
+                if state[1] is not None:
+                    screen.blit(highlight_surface(state[1]), rect)
+                if state[0] != '--':
+                    screen.blit(IMAGES[state[0]], rect)
+                dirty.append(rect)
+        self.drawn = states
+        if overlay is not None and len(dirty) > cleared:
+            draw_text(screen, *overlay)
+            dirty = [p.Rect(0, 0, BOARD_WIDTH, BOARD_HEIGHT)]
+        self.overlay = overlay
+
+        if move is not None:
+            if len(dirty) > cleared or self.animationBackground is None:
+                # The board under the piece changed: copy it again.
+                self.animationBackground = screen.subsurface(p.Rect(0, 0, BOARD_WIDTH, BOARD_HEIGHT)).copy()
+            r = move.startRow + (move.endRow - move.startRow) * progress
+            c = move.startCol + (move.endCol - move.startCol) * progress
+            self.pieceRect = p.Rect(round(c * SQ_SIZE), round(r * SQ_SIZE), SQ_SIZE, SQ_SIZE)
+            screen.blit(IMAGES[move.pieceMoved], self.pieceRect)
+            dirty.append(self.pieceRect)
+
+        moveLog = self.moveLog
+        if not self.logDrawn or moveLog.changed or moveLog.scrolling:
+            moveLog.draw(screen)
+            self.logDrawn = True
+            dirty.append(p.Rect(BOARD_WIDTH, 0, MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT))
+        return dirty
+
+
 def save_moves_to_json(moves_log):
     """
     Save the moves log to a JSON file with timestamps.
@@ -481,10 +675,48 @@ def save_moves_to_json(moves_log):
                 "move": moves_log[i]
             })
 
+    import json
     with open('.moves_log.json', 'w') as json_file:
         json.dump(player_moves, json_file)
 
 
+def find_hint(gs, openingBook, tt):
+    """
+    Suggest a move for the player.
+
+    Args:
+    - gs: The game state.
+    - openingBook: The ChessBook.OpeningBook, or None.
+    - tt: The ChessTransposition.TranspositionTable the search uses, kept for the whole game.
+
+    Returns:
+    The best book move of the position, or else the result of a short search; None if there are no valid moves.
+    """
+
+    move = openingBook.best_move(gs) if openingBook is not None else None
+    if move is None:
+        import ChessSearch
+        move = ChessSearch.search(gs, HINT_THINK_TIME_MS, tt=tt).move
+    return move
+
+
+def save_game_to_pgn(gs):
+    """
+    Save the game to a PGN file.
+
+    Args:
+    - gs: The game state, whose move log is written in standard algebraic notation.
+
+    This function writes the game to a file named '.game.pgn' that other chess programs can open.
+    """
+
+    import ChessPGN
+    headers = {'Event': "Good Chess game", 'Site': "Good Chess", 'White': "Player",
+               'Black': "Computer" if PLAY_VS_COMPUTER in (1, '1', True) else "Player"}
+    with open('.game.pgn', 'w') as pgn_file:
+        pgn_file.write(ChessPGN.format_game(ChessPGN.moves_to_san(gs.moveLog), headers, ChessPGN.game_result(gs)))
+
+
 def save_settings_to_cfg():
     """
     Save the current settings to a config file.
@@ -492,12 +724,13 @@ def save_settings_to_cfg():
     This function saves the current settings to a config file named 'settings.cfg'.
     """
 
-    global SKIN, THEME, FRAMES_PER_SQUARE, PRACTICE_MODE
+    global SKIN, THEME, FRAMES_PER_SQUARE, PRACTICE_MODE, PLAY_VS_COMPUTER
     with open('settings.cfg', 'w') as file:
         file.write(f"SKIN={SKIN}\n")
         file.write(f"THEME={THEME}\n")
         file.write(f"FRAMES_PER_SQUARE={FRAMES_PER_SQUARE}\n")
         file.write(f"PRACTICE_MODE={PRACTICE_MODE}\n")
+        file.write(f"PLAY_VS_COMPUTER={PLAY_VS_COMPUTER}\n")
 
 
 def load_settings_from_cfg():
@@ -507,7 +740,7 @@ def load_settings_from_cfg():
     This function loads the current settings from a config file named 'settings.cfg'.
     """
 
-    global SKIN, THEME, FRAMES_PER_SQUARE, PRACTICE_MODE
+    global SKIN, THEME, FRAMES_PER_SQUARE, PRACTICE_MODE, PLAY_VS_COMPUTER
     try:
         with open('settings.cfg', 'r') as file:
             lines = file.readlines()
@@ -515,6 +748,9 @@ def load_settings_from_cfg():
             THEME = lines[1].split('=')[1].strip()
             FRAMES_PER_SQUARE = lines[2].split('=')[1].strip()
             PRACTICE_MODE = lines[3].split('=')[1].strip()
+            # Settings files saved before the computer opponent existed have no fifth line.
+            if len(lines) > 4:
+                PLAY_VS_COMPUTER = lines[4].split('=')[1].strip()
     except FileNotFoundError:
         print("Settings file not found. Using default settings.")
         set_default_settings()
@@ -533,11 +769,33 @@ def set_default_settings():
     This function sets the default settings.
     """
 
-    global SKIN, THEME, FRAMES_PER_SQUARE, PRACTICE_MODE
+    global SKIN, THEME, FRAMES_PER_SQUARE, PRACTICE_MODE, PLAY_VS_COMPUTER
     SKIN = 'Default'
     THEME = 'Default'
     FRAMES_PER_SQUARE = 9
     PRACTICE_MODE = False
+    PLAY_VS_COMPUTER = False
+
+
+def open_window():
+    """
+    Open the game window and load the piece images.
+
+    Returns:
+    A tuple (screen, clock).
+
+    Only the display and font modules of pygame are started: p.init() would also start the mixer and joystick
+    modules, which the game does not use and which can take long to start.
+    """
+
+    p.display.init()
+    p.font.init()
+    p.display.set_icon(p.image.load(WINDOW_ICON_PATH))
+    p.display.set_caption('Good Chess')
+    screen = p.display.set_mode((BOARD_WIDTH + MOVE_LOG_PANEL_WIDTH, BOARD_HEIGHT))
+    screen.fill(p.Color("white"))
+    load_images()
+    return screen, p.time.Clock()
 
 
 def main():
@@ -548,30 +806,49 @@ def main():
     state accordingly.
     """
 
-    global SKIN, THEME, COLORS, MOVES_LOG, ANIMATE, PRACTICE_MODE, RPC
+    global SKIN, THEME, COLORS, MOVES_LOG, ANIMATE, PRACTICE_MODE, PLAY_VS_COMPUTER, RPC
+    load_pygame()
     menu()
     if COLORS == 0:
         sys.exit("Game did not start. Please choose a skin and theme and press START.")
-    p.init()
-    p.display.set_icon(WINDOW_ICON)
-    p.display.set_caption('Good Chess')
-    screen = p.display.set_mode((BOARD_WIDTH + MOVE_LOG_PANEL_WIDTH, BOARD_HEIGHT))
-    clock = p.time.Clock()
-    screen.fill(p.Color("white"))
-    moveLogFont = p.font.SysFont("Arial", 25, False, False)
+    screen, clock = open_window()
+    moveLog = MoveLogView(p.font.SysFont("Arial", 25, False, False))
+    # The notations are kept by the move log panel, which syncs them with the game on every frame.
+    MOVES_LOG = moveLog.notations
+    renderer = BoardRenderer(screen, moveLog)
     gs = ChessEngine.GameState()
-    load_images()
     validMoves = gs.get_valid_moves()
     moveMade = False
     running = True
     sqSelected = ()
     playerClicks = []
     gameOver = False
+    # The player is White; with PLAY_VS_COMPUTER the computer plays Black.
+    computerOpponent = PLAY_VS_COMPUTER in (1, '1', True)
+    computerSearcher = None
+    if computerOpponent:
+        # Imported here, as the process pool modules take about half of the import time of this module.
+        import ChessParallel
+        import ChessTablebase
+        tablebase = ChessTablebase.Tablebase(TABLEBASE_DIR) if os.path.isdir(TABLEBASE_DIR) else None
+        # Kept for the whole game so that each search starts from what the previous ones found.
+        computerSearcher = ChessParallel.ParallelSearcher(COMPUTER_SEARCH_WORKERS, TRANSPOSITION_TABLE_MB, tablebase)
+        # The hints search with the computer's table, so that each benefits from the other's results.
+        searchTable = computerSearcher.tt
+    else:
+        import ChessTransposition
+        searchTable = ChessTransposition.TranspositionTable(TRANSPOSITION_TABLE_MB)
+    openingBook = None
+    if os.path.exists(OPENING_BOOK_PATH):
+        import ChessBook
+        # Only mapped here; the book is read a few pages at a time as positions are looked up.
+        openingBook = ChessBook.OpeningBook(OPENING_BOOK_PATH)
 
     while running:
+        humanTurn = gs.whiteToMove or not computerOpponent
         for e in p.event.get():
             if e.type != p.MOUSEMOTION:
-                if DRP:
+                if RPC is not None:
                     RPC.update(
                         details="Playing Good Chess",
                         state=f"Moves: {len(MOVES_LOG)}",
@@ -583,8 +860,11 @@ def main():
             if e.type == p.QUIT:
                 running = False
 
+            elif e.type == p.WINDOWEXPOSED:
+                renderer.invalidate()
+
             elif e.type == p.MOUSEBUTTONDOWN and e.button == 1:
-                if not gameOver:
+                if not gameOver and humanTurn:
                     location = p.mouse.get_pos()
                     col = location[0] // SQ_SIZE
                     row = location[1] // SQ_SIZE
@@ -595,7 +875,7 @@ def main():
                         sqSelected = (row, col)
                         playerClicks.append(sqSelected)
                     if len(playerClicks) == 2:
-                        move = ChessEngine.Move(playerClicks[0], playerClicks[1], gs.board)
+                        move = ChessEngine.Move(playerClicks[0], playerClicks[1])
                         for i in range(len(validMoves)):
                             if move == validMoves[i]:
                                 if validMoves[i].isPawnPromotion:
@@ -609,16 +889,25 @@ def main():
                         if not moveMade:
                             playerClicks = [sqSelected]
 
+            elif e.type == p.KEYDOWN and e.key == p.K_h and humanTurn and not gameOver:
+                hint = find_hint(gs, openingBook, searchTable)
+                if hint is not None:
+                    # Select the piece to move, so that its moves are highlighted.
+                    sqSelected = (hint.startRow, hint.startCol)
+                    playerClicks = [sqSelected]
+
             elif (e.type == p.KEYDOWN and PRACTICE_MODE) or (e.type == p.KEYDOWN and gameOver):
                 if e.key == p.K_z:
                     gs.undo_move()
-                    if len(MOVES_LOG) > 0:
-                        MOVES_LOG.pop()
+                    # Take back the computer's reply too, so that it is the player's turn again.
+                    if computerOpponent and not gs.whiteToMove:
+                        gs.undo_move()
                     moveMade = True
                     ANIMATE = False
                     gameOver = False
                 if e.key == p.K_r:
                     gs = ChessEngine.GameState()
+                    searchTable.clear()
                     validMoves = gs.get_valid_moves()
                     sqSelected = ()
                     playerClicks = []
@@ -634,36 +923,60 @@ def main():
             elif e.type == p.KEYDOWN:
                 pass
 
+        # The computer waits for the player's move to finish sliding, as its search holds up the game loop.
+        if not gameOver and not humanTurn and not moveMade and renderer.animation is None:
+            # Known openings are played from the book without searching.
+            computerMove = openingBook.choose_move(gs) if openingBook is not None else None
+            if computerMove is None:
+                computerMove = computerSearcher.search(gs, COMPUTER_THINK_TIME_MS).move
+            if computerMove is not None:
+                gs.make_move(computerMove)
+                moveMade = True
+                ANIMATE = True
+
         if moveMade:
             if ANIMATE:
-                animate_move(gs.moveLog[-1], screen, gs.board, clock)
+                # Drawn over the next frames, while the game keeps handling input.
+                renderer.animate(gs.moveLog[-1])
             validMoves = gs.get_valid_moves()
             moveMade = False
             ANIMATE = False
 
-        draw_game_state(screen, gs, validMoves, sqSelected, moveLogFont)
-
+        overlay = None
         if gs.checkMate:
             gameOver = True
             if gs.whiteToMove:
-                draw_text(screen, 'Black wins by checkmate', font_color='Black', shadow_color='Red')
+                overlay = ('Black wins by checkmate', 60, 'Black', 'Red')
             else:
-                draw_text(screen, 'White wins by checkmate', font_color='White', shadow_color='Green')
+                overlay = ('White wins by checkmate', 60, 'White', 'Green')
         elif gs.staleMate:
             gameOver = True
-            draw_text(screen, 'Stalemate')
+            overlay = ('Stalemate', 60, 'Black', 'White')
 
-        clock.tick(MAX_FPS)
-        p.display.flip()
+        moveLog.sync(gs.moveLog)
+        # Only the squares and panels that changed are drawn and sent to the display.
+        dirty = renderer.draw(gs, validMoves, sqSelected, overlay)
+        clock.tick(MAX_FPS if renderer.animation is None else ANIMATION_FPS)
+        if dirty:
+            p.display.update(dirty)
+
+    if computerSearcher is not None:
+        computerSearcher.close()
+    if openingBook is not None:
+        openingBook.close()
+    if len(gs.moveLog) >= 2:
+        save_game_to_pgn(gs)
 
 
 if __name__ == "__main__":
     load_settings_from_cfg()
+    if DRP:
+        start_presence()
 
     main()
 
     if len(MOVES_LOG) >= 2:
         save_moves_to_json(MOVES_LOG)
 
-    if DRP:
+    if RPC is not None:
         RPC.close()
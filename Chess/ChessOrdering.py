@@ -0,0 +1,134 @@
+"""
+Move Ordering Script
+"""
+
+from ChessEngine import MOVE_PROMOTION, PIECE_NAMES
+
+# Piece values for ordering, indexed by the piece codes stored in Move.code (PIECE_NAMES order).
+ORDER_VALUES = tuple({'-': 0, 'P': 1, 'N': 3, 'B': 3, 'R': 5, 'Q': 9, 'K': 20}[piece[1]] for piece in PIECE_NAMES)
+HASH_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 20
+KILLER_SCORE = 1 << 19
+# History scores are halved once one of them passes this, so that they stay below the killer score.
+HISTORY_LIMIT = 1 << 18
+MAX_PLY = 128
+
+
+def mvv_lva(code):
+    """
+    Score a capture or promotion by most valuable victim, then least valuable attacker.
+
+    Args:
+    - code: The Move.code of the move.
+
+    Returns:
+    A score that is higher for better captures, 0 for quiet moves.
+    """
+
+    victim = ORDER_VALUES[(code >> 16) & 15]
+    if code & MOVE_PROMOTION:
+        victim += ORDER_VALUES[PIECE_NAMES.index('wQ')]
+    if not victim:
+        return 0
+    return victim * 32 - ORDER_VALUES[(code >> 12) & 15]
+
+
+class MoveOrderer:
+    """
+    Orders the moves of a position so that the ones most likely to cause a cutoff are searched first.
+
+    Attributes:
+    - useCaptures: Order captures and promotions by MVV-LVA, ahead of quiet moves.
+    - useKillers: Try the quiet moves that last caused a cutoff at the same ply (killers) before other quiet moves.
+    - useHistory: Order the other quiet moves by how often the same from-to move caused cutoffs.
+    - killers: Two killer move codes per ply.
+    - history: Cutoff scores indexed by from * 64 + to.
+    - cutoffs: Number of beta cutoffs recorded.
+    - firstMoveCutoffs: Number of those cutoffs caused by the first move searched.
+
+    The hash move always comes first. Turning the heuristics off makes it easy to measure what each one is worth.
+    """
+
+    def __init__(self, useCaptures=True, useKillers=True, useHistory=True):
+        self.useCaptures = useCaptures
+        self.useKillers = useKillers
+        self.useHistory = useHistory
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [0] * 4096
+        self.cutoffs = 0
+        self.firstMoveCutoffs = 0
+
+    def new_search(self):
+        """
+        Forget the killers of the previous search and age the history scores.
+        """
+
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [score >> 1 for score in self.history]
+
+    def order(self, moves, ply, hashMove=0):
+        """
+        Sort moves, best first.
+
+        Args:
+        - moves: The moves to order, changed in place.
+        - ply: The distance from the root.
+        - hashMove: The code of the move to search first (from the transposition table or the previous principal
+          variation), or 0.
+        """
+
+        killers = self.killers[ply] if self.useKillers and ply < MAX_PLY else (0, 0)
+        history = self.history if self.useHistory else None
+        useCaptures = self.useCaptures
+
+        def score(move):
+            code = move.code
+            if code == hashMove:
+                return HASH_MOVE_SCORE
+            if useCaptures:
+                captureScore = mvv_lva(code)
+                if captureScore:
+                    return CAPTURE_SCORE + captureScore
+            if code == killers[0]:
+                return KILLER_SCORE + 1
+            if code == killers[1]:
+                return KILLER_SCORE
+            if history is not None:
+                return history[code & 4095]
+            return 0
+
+        moves.sort(key=score, reverse=True)
+
+    def record_cutoff(self, move, ply, depth, moveIndex):
+        """
+        Record a move that caused a beta cutoff.
+
+        Args:
+        - move: The move.
+        - ply: The distance from the root.
+        - depth: The remaining depth of the search at the move's position.
+        - moveIndex: The position of the move in the ordered list.
+        """
+
+        self.cutoffs += 1
+        if moveIndex == 0:
+            self.firstMoveCutoffs += 1
+        code = move.code
+        if (code >> 16) & 15 or code & MOVE_PROMOTION:
+            return
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != code:
+                killers[1] = killers[0]
+                killers[0] = code
+        history = self.history
+        history[code & 4095] += depth * depth
+        if history[code & 4095] > HISTORY_LIMIT:
+            self.history = [score >> 1 for score in history]
+
+    def cutoff_rate(self):
+        """
+        Get the fraction of cutoffs caused by the first move searched, a measure of the ordering quality.
+        """
+
+        return self.firstMoveCutoffs / self.cutoffs if self.cutoffs else 0.0
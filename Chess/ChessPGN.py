@@ -0,0 +1,329 @@
+"""
+PGN Script
+"""
+
+import re
+from collections import namedtuple
+
+from ChessEngine import MOVE_CASTLE, MOVE_PROMOTION, PIECE_CODES, PIECE_NAMES, PROMOTION_PIECES, START_FEN, \
+    GameState, Move
+
+# The Seven Tag Roster, written first and in this order.
+SEVEN_TAG_ROSTER = (('Event', '?'), ('Site', '?'), ('Date', '????.??.??'), ('Round', '?'), ('White', '?'),
+                    ('Black', '?'), ('Result', '*'))
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+# Movetext lines are wrapped to this length.
+LINE_LENGTH = 79
+
+_HEADER = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+_UNESCAPE = re.compile(r'\\(.)')
+_TOKEN = re.compile(r'\{[^}]*\}?|;[^\n]*|[()]|\$\d+|1-0|0-1|1/2-1/2|\*|\d+\.+|[^\s{}();$.]+')
+_SAN = re.compile(r'([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?')
+_SQUARE_NAMES = tuple(Move.colsToFiles[sq & 7] + Move.rowsToRanks[sq >> 3] for sq in range(64))
+
+PGNGame = namedtuple('PGNGame', ['headers', 'moves', 'result'])
+
+
+def move_to_san(gs, move, validMoves=None):
+    """
+    Get the standard algebraic notation (SAN) of a move, without the check or mate marker.
+
+    Args:
+    - gs: The game state the move is played in.
+    - move: The Move, one of the valid moves of the position.
+    - validMoves: The valid moves of the position, if already generated, for disambiguation.
+
+    Returns:
+    The SAN string, e.g. 'Nbd7', 'exd6', 'O-O' or 'e8=Q'.
+    """
+
+    code = move.code
+    if code & MOVE_CASTLE:
+        return 'O-O' if (code >> 6) & 7 == 6 else 'O-O-O'
+    piece = PIECE_NAMES[(code >> 12) & 15][1]
+    target = _SQUARE_NAMES[(code >> 6) & 63]
+    capture = 'x' if (code >> 16) & 15 else ''
+    if piece == 'P':
+        san = (Move.colsToFiles[code & 7] + capture if capture else '') + target
+        if code & MOVE_PROMOTION:
+            san += '=' + (PROMOTION_PIECES[(code >> 23) & 7] or gs.promotionChoice)
+        return san
+
+    # Other pieces of the same type that can reach the same square.
+    if validMoves is None:
+        validMoves = gs.get_valid_moves()
+    startSq = code & 63
+    others = [other.code & 63 for other in validMoves
+              if not (other.code ^ code) & 0xFFC0 and other.code & 63 != startSq]
+    disambiguation = ''
+    if others:
+        if all(sq & 7 != startSq & 7 for sq in others):
+            disambiguation = Move.colsToFiles[startSq & 7]
+        elif all(sq >> 3 != startSq >> 3 for sq in others):
+            disambiguation = Move.rowsToRanks[startSq >> 3]
+        else:
+            disambiguation = _SQUARE_NAMES[startSq]
+    return piece + disambiguation + capture + target
+
+
+def parse_san(gs, san, validMoves=None):
+    """
+    Find the move a SAN string stands for.
+
+    Args:
+    - gs: The game state the move is played in.
+    - san: The SAN string. Check and mate markers and annotations such as '!?' are ignored.
+    - validMoves: The valid moves of the position, if already generated.
+
+    Returns:
+    The Move, with its promotion piece set for promotions.
+
+    Raises:
+    ValueError if the string is not SAN, or does not match exactly one valid move.
+    """
+
+    if validMoves is None:
+        validMoves = gs.get_valid_moves()
+    token = san.rstrip('+#!?')
+    if token in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+        kingside = len(token) == 3
+        for move in validMoves:
+            if move.code & MOVE_CASTLE and ((move.code >> 6) & 7 == 6) == kingside:
+                return move
+        raise ValueError(f"Illegal move {san!r} in {gs.to_fen()}")
+
+    match = _SAN.fullmatch(token)
+    if match is None:
+        raise ValueError(f"Invalid SAN {san!r}")
+    piece, fromFile, fromRank, target, promotion = match.groups()
+    pieceCode = PIECE_CODES[('w' if gs.whiteToMove else 'b') + (piece or 'P')]
+    key = (Move.ranksToRows[target[1]] * 8 + Move.filesToCols[target[0]]) << 6 | pieceCode << 12
+    candidates = [move for move in validMoves
+                  if not (move.code ^ key) & 0xFFC0 and
+                  (fromFile is None or move.code & 7 == Move.filesToCols[fromFile]) and
+                  (fromRank is None or (move.code & 63) >> 3 == Move.ranksToRows[fromRank])]
+    if len(candidates) != 1:
+        raise ValueError(f"{'Ambiguous' if candidates else 'Illegal'} move {san!r} in {gs.to_fen()}")
+    move = candidates[0]
+    if bool(move.code & MOVE_PROMOTION) != bool(promotion):
+        raise ValueError(f"Invalid promotion {san!r} in {gs.to_fen()}")
+    if promotion:
+        move = Move.from_code(move.code | PROMOTION_PIECES.index(promotion) << 23)
+    return move
+
+
+def moves_to_san(moves, fen=START_FEN):
+    """
+    Convert a sequence of moves to SAN, with check and mate markers.
+
+    Args:
+    - moves: The moves of the game, e.g. gs.moveLog.
+    - fen: The FEN string of the position the moves start from.
+
+    Returns:
+    A list of SAN strings.
+
+    Raises:
+    ValueError if a move is not valid in its position.
+    """
+
+    gs = GameState(fen=fen)
+    validMoves = gs.get_valid_moves()
+    sanMoves = []
+    for move in moves:
+        if move not in validMoves:
+            raise ValueError(f"Illegal move {move.get_chess_notation()} in {gs.to_fen()}")
+        san = move_to_san(gs, move, validMoves)
+        gs.make_move(move)
+        validMoves = gs.get_valid_moves()
+        if gs.inCheck:
+            san += '+' if validMoves else '#'
+        sanMoves.append(san)
+    return sanMoves
+
+
+def game_result(gs):
+    """
+    Get the PGN result of a game: '1-0' or '0-1' after checkmate, '1/2-1/2' after stalemate, '*' otherwise.
+    """
+
+    if gs.checkMate:
+        return '0-1' if gs.whiteToMove else '1-0'
+    if gs.staleMate:
+        return '1/2-1/2'
+    return '*'
+
+
+def read_games(file):
+    """
+    Read the games of a PGN file one at a time.
+
+    Args:
+    - file: An open text file, or any iterable of lines. Only the game being read is kept in memory, so databases of
+      any size can be streamed.
+
+    Yields:
+    A PGNGame (headers, moves, result) per game: the tag pairs as a dictionary, the SAN strings of the main line
+    (comments, variations and annotation glyphs are skipped) and the result.
+    """
+
+    headers = {}
+    movetext = []
+    inComment = False
+    for line in file:
+        line = line.strip()
+        if line.startswith('[') and not inComment:
+            if movetext:
+                yield _make_game(headers, movetext)
+                headers = {}
+                movetext = []
+            match = _HEADER.match(line)
+            if match:
+                headers[match.group(1)] = _UNESCAPE.sub(r'\1', match.group(2))
+        elif line and not line.startswith('%'):
+            movetext.append(line)
+            # A comment left open continues on the next lines, which may start with '['.
+            inComment = _ends_in_comment(line, inComment)
+    if headers or movetext:
+        yield _make_game(headers, movetext)
+
+
+def _ends_in_comment(line, inComment):
+    # Whether a brace comment is still open at the end of the line. Braces inside a ';' comment, which runs to the end
+    # of the line, do not count, and neither does a ';' inside a brace comment.
+    i = 0
+    while True:
+        if inComment:
+            i = line.find('}', i)
+            if i < 0:
+                return True
+            inComment = False
+        else:
+            opened, semicolon = line.find('{', i), line.find(';', i)
+            if opened < 0 or 0 <= semicolon < opened:
+                return False
+            i = opened
+            inComment = True
+        i += 1
+
+
+def _make_game(headers, movetext):
+    moves = []
+    result = headers.get('Result', '*')
+    depth = 0
+    for token in _TOKEN.findall('\n'.join(movetext)):
+        first = token[0]
+        if first == '(':
+            depth += 1
+        elif first == ')':
+            depth = max(depth - 1, 0)
+        elif depth or first in '{;$' or token[-1] == '.':
+            continue
+        elif token in RESULTS:
+            result = token
+        else:
+            moves.append(token)
+    return PGNGame(headers, moves, result)
+
+
+def replay_game(game, validate=True):
+    """
+    Play the moves of a game through a GameState.
+
+    Args:
+    - game: A PGNGame. A FEN tag sets the starting position.
+    - validate: Check the game result against the final position: a checkmate must be scored as one.
+
+    Returns:
+    The GameState after the last move, with checkMate and staleMate set.
+
+    Raises:
+    ValueError if a move is invalid or illegal, or the result does not match the final position.
+    """
+
+    gs = GameState(fen=game.headers.get('FEN', START_FEN))
+    validMoves = gs.get_valid_moves()
+    for ply, san in enumerate(game.moves):
+        try:
+            move = parse_san(gs, san, validMoves)
+        except ValueError as e:
+            raise ValueError(f"Move {ply // 2 + 1}{'.' if gs.whiteToMove else '...'} {san}: {e}") from None
+        gs.make_move(move)
+        validMoves = gs.get_valid_moves()
+    if validate and gs.checkMate and game.result != game_result(gs):
+        raise ValueError(f"Result {game.result} does not match the checkmate on the board")
+    return gs
+
+
+def format_game(sanMoves, headers=None, result='*', fen=START_FEN):
+    """
+    Format a game as PGN.
+
+    Args:
+    - sanMoves: The SAN strings of the moves, e.g. from moves_to_san.
+    - headers: A dictionary of tag pairs. The Seven Tag Roster is always written, with '?' for missing tags.
+    - result: The game result, one of RESULTS.
+    - fen: The FEN string of the starting position; the SetUp and FEN tags are added when it is not the standard one.
+
+    Returns:
+    The PGN text of the game, ending with a blank line.
+    """
+
+    headers = dict(headers or {})
+    headers['Result'] = result
+    if fen != START_FEN:
+        headers['SetUp'] = '1'
+        headers['FEN'] = fen
+    lines = [f'[{tag} "{_escape(headers.pop(tag, default))}"]' for tag, default in SEVEN_TAG_ROSTER]
+    lines.extend(f'[{tag} "{_escape(value)}"]' for tag, value in headers.items())
+    lines.append('')
+
+    fields = fen.split()
+    whiteToMove = fields[1] == 'w'
+    moveNumber = int(fields[5]) if len(fields) > 5 else 1
+    tokens = []
+    for i, san in enumerate(sanMoves):
+        if whiteToMove:
+            tokens.append(f"{moveNumber}. {san}")
+        else:
+            tokens.append(f"{moveNumber}... {san}" if i == 0 else san)
+            moveNumber += 1
+        whiteToMove = not whiteToMove
+    tokens.append(result)
+
+    line = ''
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > LINE_LENGTH:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    lines.append('')
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def write_games(file, games):
+    """
+    Write games to a PGN file one at a time.
+
+    Args:
+    - file: An open text file.
+    - games: An iterable of PGNGame, e.g. from read_games. The FEN tag, if any, sets the starting position.
+
+    Returns:
+    The number of games written.
+    """
+
+    count = 0
+    for game in games:
+        headers = dict(game.headers)
+        fen = headers.pop('FEN', START_FEN)
+        headers.pop('SetUp', None)
+        file.write(format_game(game.moves, headers, game.result, fen))
+        count += 1
+    return count
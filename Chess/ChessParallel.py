@@ -0,0 +1,138 @@
+"""
+Parallel Search Script
+"""
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ChessSearch import search
+from ChessTransposition import TranspositionTable, table_bytes
+
+# Transposition table and stop signal of a helper process, set up once by _init_helper.
+_table = None
+_stopEvent = None
+
+
+def _init_helper(buffer, sizeMb, stopEvent):
+    global _table, _stopEvent
+    _table = TranspositionTable(sizeMb, buffer)
+    _stopEvent = stopEvent
+
+
+def _helper_search(gs, max_time_ms, max_depth, firstDepth, age):
+    """
+    Search a position in a helper process, filling the shared transposition table until the main search sets the
+    stop signal.
+
+    Returns:
+    The number of nodes searched.
+    """
+
+    # search() advances the age, so start one behind to store entries with the same age as the main search.
+    _table.age = (age - 1) & 255
+    return search(gs, max_time_ms, max_depth, tt=_table, first_depth=firstDepth, stop_event=_stopEvent).nodes
+
+
+class ParallelSearcher:
+    """
+    Runs the search on several processes that share one transposition table (Lazy SMP).
+
+    Attributes:
+    - workers: Number of processes searching each position, the main process included. 1 if the helper processes
+      could not be started.
+    - tt: The TranspositionTable, kept in shared memory when there are helper processes.
+    - pool: The ProcessPoolExecutor running the helper searches, or None.
+    - tablebase: The ChessTablebase.Tablebase used by the main search, or None.
+
+    The main process runs the normal search and its result is the one returned. The helpers search the same position
+    at the same time, half of them starting one ply deeper, and only contribute the entries they leave in the shared
+    table, which let the main search skip work. With one worker, the search is exactly search() on a private table,
+    which makes its results reproducible.
+    """
+
+    def __init__(self, workers=None, sizeMb=16, tablebase=None):
+        """
+        Start the helper processes.
+
+        Args:
+        - workers: Number of processes, by default one per CPU core.
+        - sizeMb: Transposition table memory budget in megabytes.
+        - tablebase: A ChessTablebase.Tablebase for the main search. The helpers search without it: their entries only
+          guide the main search, which scores the tablebase positions exactly.
+        """
+
+        self.tablebase = tablebase
+        self.workers = workers if workers is not None else multiprocessing.cpu_count()
+        self.pool = None
+        if self.workers > 1:
+            try:
+                buffer = multiprocessing.RawArray('B', table_bytes(sizeMb))
+                self.stopEvent = multiprocessing.Event()
+                self.pool = ProcessPoolExecutor(self.workers - 1, initializer=_init_helper,
+                                                initargs=(buffer, sizeMb, self.stopEvent))
+                # Start the helpers now, so that failures show here and not in the first search.
+                self.pool.submit(int).result()
+                self.tt = TranspositionTable(sizeMb, buffer)
+            except (OSError, ImportError, NotImplementedError) as e:
+                print(f"Parallel search unavailable, searching on one process: {e}")
+                self.close()
+                self.workers = 1
+        if self.pool is None:
+            self.tt = TranspositionTable(sizeMb)
+
+    def search(self, gs, max_time_ms=1000, max_depth=64, callback=None, stop_event=None):
+        """
+        Find the best move for the player to move.
+
+        Args:
+        - gs: The game state to search. It is returned unchanged.
+        - max_time_ms: Time budget in milliseconds.
+        - max_depth: The deepest iteration to run.
+        - callback: Called with a SearchResult after each completed depth of the main search.
+        - stop_event: An object with an is_set() method, e.g. a threading.Event, that stops the search when set.
+
+        Returns:
+        The SearchResult of the main search, with nodes and nps counting the helper searches too.
+        """
+
+        if self.pool is None:
+            return search(gs, max_time_ms, max_depth, callback=callback, tt=self.tt, stop_event=stop_event,
+                          tablebase=self.tablebase)
+
+        start = time.perf_counter()
+        self.stopEvent.clear()
+        age = (self.tt.age + 1) & 255
+        helpers = [self.pool.submit(_helper_search, gs, max_time_ms, max_depth, 1 + i % 2, age)
+                   for i in range(1, self.workers)]
+        try:
+            result = search(gs, max_time_ms, max_depth, callback=callback, tt=self.tt, stop_event=stop_event,
+                            tablebase=self.tablebase)
+        finally:
+            self.stopEvent.set()
+            nodes = sum(helper.result() for helper in helpers)
+        elapsed = time.perf_counter() - start
+        nodes += result.nodes
+        return result._replace(nodes=nodes, nps=int(nodes / max(elapsed, 1e-9)), timeMs=int(elapsed * 1000))
+
+    def clear(self):
+        """
+        Remove all entries from the transposition table, e.g. when a new game starts.
+        """
+
+        self.tt.clear()
+
+    def close(self):
+        """
+        Stop the helper processes.
+        """
+
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
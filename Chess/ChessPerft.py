@@ -0,0 +1,147 @@
+"""
+Perft Script
+"""
+
+import argparse
+import sys
+import time
+
+import ChessEngine
+
+# Standard reference positions with their known node counts for depth 1, 2, 3...
+# Source: https://www.chessprogramming.org/Perft_Results
+POSITIONS = [
+    ("Start position", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+     [20, 400, 8902, 197281, 4865609]),
+    ("Kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("Position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("Position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("Position 4 mirrored", "r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1",
+     [6, 264, 9467, 422333]),
+    ("Position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("Position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+
+def legal_moves(gs):
+    """
+    Get the valid moves of a position with every promotion piece as a separate move.
+
+    Args:
+    - gs: The game state.
+
+    Returns:
+    A list of Move objects. Reference perft counts include all four promotions.
+    """
+
+    return ChessEngine.expand_promotions(gs.get_valid_moves())
+
+
+def perft(gs, depth):
+    """
+    Count the leaf nodes of the legal move tree.
+
+    Args:
+    - gs: The game state to search from.
+    - depth: The number of plies to search.
+
+    Returns:
+    The number of leaf nodes at the given depth.
+    """
+
+    if depth == 0:
+        return 1
+    moves = legal_moves(gs)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        gs.make_move(move)
+        nodes += perft(gs, depth - 1)
+        gs.undo_move()
+    return nodes
+
+
+def divide(gs, depth):
+    """
+    Count the leaf nodes below each root move.
+
+    Args:
+    - gs: The game state to search from.
+    - depth: The number of plies to search, including the root move.
+
+    Returns:
+    A list of (notation, nodes) pairs, one per root move, in UCI notation (e.g. 'e7e8q').
+    """
+
+    results = []
+    for move in legal_moves(gs):
+        gs.make_move(move)
+        nodes = perft(gs, depth - 1) if depth > 1 else 1
+        gs.undo_move()
+        results.append((move.get_chess_notation() + move.promotionPiece.lower(), nodes))
+    return results
+
+
+def run_suite(maxDepth):
+    """
+    Run perft on the reference positions and print the node counts and speed.
+
+    Args:
+    - maxDepth: The deepest depth to run for each position.
+
+    Returns:
+    The number of node count mismatches.
+    """
+
+    failures = 0
+    totalNodes = 0
+    totalTime = 0.0
+    for name, fen, counts in POSITIONS:
+        for depth in range(1, min(maxDepth, len(counts)) + 1):
+            gs = ChessEngine.GameState.from_fen(fen)
+            start = time.perf_counter()
+            nodes = perft(gs, depth)
+            elapsed = time.perf_counter() - start
+            totalNodes += nodes
+            totalTime += elapsed
+            status = "ok" if nodes == counts[depth - 1] else f"FAIL (expected {counts[depth - 1]})"
+            if nodes != counts[depth - 1]:
+                failures += 1
+            print(f"{name:<20} depth {depth}: {nodes:>9} nodes {elapsed:8.3f}s "
+                  f"{nodes / max(elapsed, 1e-9):>9.0f} nodes/s  {status}")
+    print(f"Total: {totalNodes} nodes in {totalTime:.3f}s ({totalNodes / max(totalTime, 1e-9):.0f} nodes/s), "
+          f"{failures} failures")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Good Chess perft: move generation correctness and speed")
+    parser.add_argument('--depth', type=int, default=3, help="deepest depth to run (default: 3)")
+    parser.add_argument('--fen', help="run a single position instead of the reference suite")
+    parser.add_argument('--divide', action='store_true', help="print the node count below each root move")
+    args = parser.parse_args()
+
+    if args.fen is None and not args.divide:
+        sys.exit(1 if run_suite(args.depth) else 0)
+
+    gs = ChessEngine.GameState.from_fen(args.fen or POSITIONS[0][1])
+    start = time.perf_counter()
+    if args.divide:
+        results = divide(gs, args.depth)
+        for notation, nodes in results:
+            print(f"{notation}: {nodes}")
+        nodes = sum(count for _, count in results)
+    else:
+        nodes = perft(gs, args.depth)
+    elapsed = time.perf_counter() - start
+    print(f"Nodes: {nodes} in {elapsed:.3f}s ({nodes / max(elapsed, 1e-9):.0f} nodes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Discord Presence Script
+"""
+
+import threading
+import time
+
+# Discord accepts 5 activity updates per 20 seconds.
+UPDATE_INTERVAL = 20 / 5
+# Seconds between attempts to connect again after the connection failed or was lost.
+RECONNECT_INTERVAL = 30.0
+
+
+class PresenceWorker:
+    """
+    Sends Rich Presence updates from a background thread, so that the game loop never waits for Discord.
+
+    Attributes:
+    - connect: Function returning a connected client with update(**state) and close() methods, e.g. a
+      pypresence.Presence after connect(). It is called on the worker thread.
+    - interval: Least number of seconds between two updates sent.
+    - reconnectInterval: Seconds between connection attempts.
+    - requested: Number of update() calls.
+    - sent: Number of updates sent to Discord.
+    - coalesced: Number of updates replaced by a newer one before they were sent.
+    - failures: Number of failed connection attempts and updates.
+    - connected: True while there is a working connection.
+
+    update() only stores the state in a single-slot mailbox and returns: the worker sends the latest state at most once
+    per interval, so a burst of events costs one message. When the connection fails or is lost, the worker keeps the
+    latest state and connects again every reconnectInterval seconds.
+    """
+
+    def __init__(self, connect, interval=UPDATE_INTERVAL, reconnectInterval=RECONNECT_INTERVAL):
+        self.connect = connect
+        self.interval = interval
+        self.reconnectInterval = reconnectInterval
+        self.requested = self.sent = self.coalesced = self.failures = 0
+        self.connected = False
+        self._condition = threading.Condition()
+        self._pending = None
+        self._closed = False
+        self._lastError = None
+        self._thread = threading.Thread(target=self._run, name='discord-presence', daemon=True)
+
+    def start(self):
+        """
+        Start the worker thread, which connects right away.
+
+        Returns:
+        The worker, for chaining.
+        """
+
+        self._thread.start()
+        return self
+
+    def update(self, **state):
+        """
+        Set the presence to show, replacing any state not sent yet. Never blocks on Discord.
+
+        Args:
+        - state: The keyword arguments of the client's update(), e.g. details, state, large_image, buttons.
+        """
+
+        with self._condition:
+            self.requested += 1
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = state
+            self._condition.notify()
+
+    def close(self, timeout=1.0):
+        """
+        Stop the worker thread and close the connection.
+
+        Args:
+        - timeout: Seconds to wait for the thread, which may be in the middle of a call to Discord.
+        """
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _report(self, error):
+        # Each error is printed once, not on every reconnection attempt.
+        self.failures += 1
+        message = f"{type(error).__name__}: {error}"
+        if message != self._lastError:
+            print(f"Discord Rich Presence unavailable: {message}")
+            self._lastError = message
+
+    def _run(self):
+        client = None
+        lastSent = nextConnect = float('-inf')
+        try:
+            while not self._closed:
+                if client is None and time.monotonic() >= nextConnect:
+                    try:
+                        client = self.connect()
+                        self.connected = True
+                        self._lastError = None
+                    except Exception as e:
+                        self._report(e)
+                        nextConnect = time.monotonic() + self.reconnectInterval
+
+                # Newer states replace the pending one while waiting.
+                with self._condition:
+                    if self._closed:
+                        return
+                    now = time.monotonic()
+                    if client is None:
+                        self._condition.wait(max(nextConnect - now, 0.0))
+                        continue
+                    if self._pending is None:
+                        self._condition.wait()
+                        continue
+                    if now < lastSent + self.interval:
+                        self._condition.wait(lastSent + self.interval - now)
+                        continue
+                    state = self._pending
+                    self._pending = None
+
+                try:
+                    client.update(**state)
+                    self.sent += 1
+                    lastSent = time.monotonic()
+                except Exception as e:
+                    # Connection lost: keep the state to send after reconnecting, unless a newer one arrived.
+                    self._report(e)
+                    with self._condition:
+                        if self._pending is None:
+                            self._pending = state
+                    self._close_client(client)
+                    client = None
+                    self.connected = False
+                    nextConnect = time.monotonic() + self.reconnectInterval
+        finally:
+            if client is not None:
+                self._close_client(client)
+            self.connected = False
+
+    @staticmethod
+    def _close_client(client):
+        try:
+            client.close()
+        except Exception:
+            pass
@@ -0,0 +1,139 @@
+"""
+Game Replay Script
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import ChessPGN
+
+# Number of games sent to a worker process at a time.
+DEFAULT_CHUNK_SIZE = 64
+# Seconds between progress lines.
+PROGRESS_INTERVAL = 2.0
+
+
+def validate_game(index, game):
+    """
+    Replay one game and describe the outcome.
+
+    Args:
+    - index: The position of the game in the input, counting from 1.
+    - game: A ChessPGN.PGNGame.
+
+    Returns:
+    A dictionary with the game index, players, number of moves, recorded result, final position ('checkmate',
+    'stalemate' or 'ongoing'), final FEN and error. On an error, only the index, players and error are set, and the
+    rest is None.
+    """
+
+    record = {'game': index, 'white': game.headers.get('White', '?'), 'black': game.headers.get('Black', '?'),
+              'moves': None, 'result': game.result, 'final': None, 'fen': None, 'error': None}
+    try:
+        gs = ChessPGN.replay_game(game)
+    except Exception as e:
+        # A malformed record must not stop the batch; it is reported in its own result instead.
+        record['error'] = f"{type(e).__name__}: {e}"
+        return record
+    record['moves'] = len(game.moves)
+    record['final'] = 'checkmate' if gs.checkMate else 'stalemate' if gs.staleMate else 'ongoing'
+    record['fen'] = gs.to_fen()
+    return record
+
+
+def validate_chunk(chunk):
+    """
+    Replay a chunk of (index, game) pairs, e.g. in a worker process.
+
+    Returns:
+    The validate_game records, in order.
+    """
+
+    return [validate_game(index, game) for index, game in chunk]
+
+
+def _chunks(games, chunkSize):
+    numbered = enumerate(games, 1)
+    while True:
+        chunk = list(islice(numbered, chunkSize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def replay_games(games, workers=None, chunkSize=DEFAULT_CHUNK_SIZE):
+    """
+    Replay and validate games on a pool of processes.
+
+    Args:
+    - games: An iterable of ChessPGN.PGNGame, e.g. from ChessPGN.read_games. It is consumed as the work progresses.
+    - workers: Number of processes, by default one per CPU core. With 1, the games are replayed in this process.
+    - chunkSize: Number of games per work unit.
+
+    Yields:
+    A validate_game record per game, in input order. At most two chunks per worker are in flight, so memory use
+    does not grow with the input.
+    """
+
+    workers = workers if workers is not None else multiprocessing.cpu_count()
+    chunks = _chunks(games, chunkSize)
+    if workers <= 1:
+        for chunk in chunks:
+            yield from validate_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque(pool.submit(validate_chunk, chunk) for chunk in islice(chunks, 2 * workers))
+        while pending:
+            records = pending.popleft().result()
+            for chunk in islice(chunks, 1):
+                pending.append(pool.submit(validate_chunk, chunk))
+            yield from records
+
+
+def run(inputPath, outputPath, workers=None, chunkSize=DEFAULT_CHUNK_SIZE):
+    """
+    Replay the games of a PGN file, write one JSON record per game to the output file and print progress.
+
+    Returns:
+    A tuple (games, errors).
+    """
+
+    games = errors = 0
+    start = lastReport = time.perf_counter()
+    with open(inputPath, encoding='utf-8', errors='replace') as inputFile, \
+            open(outputPath, 'w', encoding='utf-8') as outputFile:
+        for record in replay_games(ChessPGN.read_games(inputFile), workers, chunkSize):
+            outputFile.write(json.dumps(record) + '\n')
+            games += 1
+            if record['error'] is not None:
+                errors += 1
+            now = time.perf_counter()
+            if now - lastReport >= PROGRESS_INTERVAL:
+                lastReport = now
+                print(f"{games} games, {errors} errors, {games / (now - start):.1f} games/s", flush=True)
+    elapsed = time.perf_counter() - start
+    print(f"Total: {games} games in {elapsed:.1f}s ({games / max(elapsed, 1e-9):.1f} games/s), {errors} errors")
+    return games, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Good Chess batch replay: check that every move of a PGN file is "
+                                                 "legal and record how each game ends")
+    parser.add_argument('input', help="PGN file to replay")
+    parser.add_argument('--output', default='replay.jsonl', help="JSON lines file with one record per game")
+    parser.add_argument('--workers', type=int, default=None, help="number of processes (default: one per core)")
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK_SIZE, help="games per work unit")
+    args = parser.parse_args()
+    _, errors = run(args.input, args.output, args.workers, args.chunk)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
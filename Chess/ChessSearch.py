@@ -0,0 +1,316 @@
+"""
+Search Script
+"""
+
+import time
+from collections import namedtuple
+
+from ChessEngine import PROMOTION_PIECES, Move, expand_promotions
+from ChessEvaluation import MATERIAL_MG, taper
+from ChessOrdering import MoveOrderer, mvv_lva
+from ChessTransposition import BOUND_EXACT, BOUND_LOWER, BOUND_UPPER, TranspositionTable
+
+MATE_SCORE = 100000
+# Scores beyond MATE_THRESHOLD are mates, MATE_SCORE - abs(score) plies away.
+MATE_THRESHOLD = MATE_SCORE - 1000
+INFINITY = MATE_SCORE + 1
+# The clock and node budget are checked once every CHECK_INTERVAL nodes (a power of two).
+CHECK_INTERVAL = 1024
+# Margin for positional gains when deciding that a capture in the quiescence search cannot raise alpha.
+DELTA_MARGIN = 200
+# Only queen promotions are searched in the quiescence search.
+QUEEN_PROMOTION = PROMOTION_PIECES.index('Q') << 23
+# Size of the transposition table used when search() is not given one.
+DEFAULT_TABLE_MB = 16
+
+SearchResult = namedtuple('SearchResult', ['move', 'score', 'depth', 'nodes', 'nps', 'pv', 'timeMs'])
+
+
+def evaluate(gs):
+    """
+    Evaluate a position statically.
+
+    Args:
+    - gs: The game state to evaluate.
+
+    Returns:
+    The material and piece-square score in centipawns, tapered between middlegame and endgame by the game phase, from
+    the point of view of the player to move. The terms are kept up to date by make_move/undo_move, so nothing is
+    scanned here.
+    """
+
+    score = taper(gs.mgScore, gs.egScore, gs.phase)
+    return score if gs.whiteToMove else -score
+
+
+def is_repetition(gs):
+    """
+    Check if the current position already occurred since the last capture or pawn move.
+
+    Args:
+    - gs: The game state.
+
+    Returns:
+    True if an earlier position with the same player to move has the same hash, False otherwise. Only the last
+    halfmoveClock positions can repeat the current one.
+    """
+
+    undoLog = gs.undoLog
+    plies = len(undoLog)
+    for i in range(plies - 2, max(plies - gs.halfmoveClock, 0) - 1, -2):
+        if undoLog[i][3] == gs.hash:
+            return True
+    return False
+
+
+def score_to_table(score, ply):
+    """
+    Convert a score for storing in the transposition table: mate scores are stored as the distance to mate from the
+    position, not from the root.
+    """
+
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    """
+    Convert a score read from the transposition table back to a score relative to the root.
+    """
+
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
+
+
+class Searcher:
+    """
+    State of one search: the position being searched, the limits and the counters.
+
+    Attributes:
+    - gs: The game state, changed by make_move/undo_move during the search and restored afterwards.
+    - deadline: time.perf_counter() value at which the search stops.
+    - maxNodes: Node budget, or None for no limit.
+    - nodes: Number of nodes visited so far.
+    - stopped: True once a limit was hit; the iteration in progress is then discarded.
+    - pvMoves: Principal variation of the last completed iteration, searched first in the next one.
+    - rootPv: Principal variation of the iteration in progress, filled in as root moves complete.
+    - tt: The TranspositionTable shared by all the iterations.
+    - orderer: The MoveOrderer that sorts the moves of each position.
+    - stopEvent: An object with an is_set() method, e.g. a multiprocessing.Event, that stops the search when set by
+      another process, or None.
+    - tablebase: A ChessTablebase.Tablebase giving the exact score of the endgames it covers, or None.
+    """
+
+    def __init__(self, gs, deadline, maxNodes=None, tt=None, orderer=None, stopEvent=None, tablebase=None):
+        self.gs = gs
+        self.tt = tt if tt is not None else TranspositionTable(DEFAULT_TABLE_MB)
+        self.orderer = orderer if orderer is not None else MoveOrderer()
+        self.deadline = deadline
+        self.maxNodes = maxNodes
+        self.nodes = 0
+        self.stopped = False
+        self.pvMoves = []
+        self.rootPv = []
+        self.stopEvent = stopEvent
+        self.tablebase = tablebase
+
+    def check_limits(self):
+        if self.stopEvent is not None and self.stopEvent.is_set():
+            self.stopped = True
+            return
+        # Keep searching until at least one root move is searched, so that there is a move to return.
+        if not self.pvMoves and not self.rootPv:
+            return
+        if time.perf_counter() >= self.deadline or (self.maxNodes is not None and self.nodes >= self.maxNodes):
+            self.stopped = True
+
+    def negamax(self, depth, alpha, beta, ply, pv):
+        """
+        Search a position with alpha-beta pruning.
+
+        Args:
+        - depth: The remaining depth in plies.
+        - alpha: The score the player to move is already guaranteed.
+        - beta: The score the opponent is already guaranteed (as a bound for the player to move).
+        - ply: The distance from the root.
+        - pv: A list replaced with the best line found from this position.
+
+        Returns:
+        The score of the position from the point of view of the player to move.
+        """
+
+        gs = self.gs
+        if ply > 0 and (is_repetition(gs) or gs.insufficient_material()):
+            return 0
+        if ply > 0 and self.tablebase is not None:
+            entry = self.tablebase.probe(gs)
+            if entry is not None:
+                result, plies = entry
+                return result * (MATE_SCORE - ply - plies)
+        if depth <= 0:
+            return self.quiescence(alpha, beta, ply)
+        self.nodes += 1
+        if self.nodes & (CHECK_INTERVAL - 1) == 0:
+            self.check_limits()
+
+        hashMove = 0
+        entry = self.tt.probe(gs.hash)
+        if entry is not None:
+            hashMove, entryDepth, bound, score = entry
+            if ply > 0 and entryDepth >= depth:
+                score = score_from_table(score, ply)
+                if bound == BOUND_EXACT or (bound == BOUND_LOWER and score >= beta) or \
+                        (bound == BOUND_UPPER and score <= alpha):
+                    return score
+
+        moves = expand_promotions(gs.get_valid_moves())
+        if not moves:
+            return -MATE_SCORE + ply if gs.inCheck else 0
+        # Without a transposition table move, the previous iteration's principal variation is tried first.
+        if not hashMove and ply < len(self.pvMoves):
+            hashMove = self.pvMoves[ply].code
+        self.orderer.order(moves, ply, hashMove)
+
+        alphaOriginal = alpha
+        bestScore = -INFINITY
+        bestMove = None
+        for i in range(len(moves)):
+            move = moves[i]
+            childPv = []
+            gs.make_move(move)
+            score = -self.negamax(depth - 1, -beta, -alpha, ply + 1, childPv)
+            gs.undo_move()
+            if self.stopped:
+                return 0
+            if score > bestScore:
+                bestScore = score
+                bestMove = move
+                if score > alpha:
+                    alpha = score
+                    pv[:] = [move] + childPv
+                    if alpha >= beta:
+                        self.orderer.record_cutoff(move, ply, depth, i)
+                        break
+
+        if bestScore <= alphaOriginal:
+            bound = BOUND_UPPER
+        elif bestScore >= beta:
+            bound = BOUND_LOWER
+        else:
+            bound = BOUND_EXACT
+        self.tt.store(gs.hash, bestMove.code, depth, bound, score_to_table(bestScore, ply))
+        return bestScore
+
+    def quiescence(self, alpha, beta, ply):
+        """
+        Search only captures and queen promotions until the position is quiet, so that the static evaluation is not
+        taken in the middle of an exchange.
+
+        Args:
+        - alpha: The score the player to move is already guaranteed.
+        - beta: The score the opponent is already guaranteed.
+        - ply: The distance from the root.
+
+        Returns:
+        The score of the position from the point of view of the player to move.
+        """
+
+        gs = self.gs
+        self.nodes += 1
+        if self.nodes & (CHECK_INTERVAL - 1) == 0:
+            self.check_limits()
+
+        standPat = evaluate(gs)
+        if standPat >= beta:
+            return standPat
+        if standPat > alpha:
+            alpha = standPat
+        captures = []
+        for move in gs.get_valid_moves():
+            gain = MATERIAL_MG.get(move.pieceCaptured[1], 0)
+            if move.isPawnPromotion:
+                gain += MATERIAL_MG['Q'] - MATERIAL_MG['P']
+                move = Move.from_code(move.code | QUEEN_PROMOTION)
+            elif not gain:
+                continue
+            # Delta pruning: skip captures that cannot reach alpha even if the piece is won for free.
+            if standPat + gain + DELTA_MARGIN <= alpha:
+                continue
+            captures.append((mvv_lva(move.code), move))
+        # Most valuable victim, least valuable attacker first, so that the cutoffs come early.
+        captures.sort(key=lambda capture: capture[0], reverse=True)
+        for _, move in captures:
+            gs.make_move(move)
+            score = -self.quiescence(-beta, -alpha, ply + 1)
+            gs.undo_move()
+            if self.stopped:
+                return 0
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        return alpha
+
+
+def search(gs, max_time_ms=1000, max_depth=64, max_nodes=None, callback=None, tt=None, orderer=None, first_depth=1,
+           stop_event=None, tablebase=None):
+    """
+    Find the best move for the player to move with iterative deepening alpha-beta search.
+
+    Args:
+    - gs: The game state to search. It is returned unchanged.
+    - max_time_ms: Time budget in milliseconds. The search stops cleanly when it runs out, keeping the result of the
+      last completed depth.
+    - max_depth: The deepest iteration to run.
+    - max_nodes: Node budget, or None for no limit.
+    - callback: Called with a SearchResult after each completed depth, e.g. to print progress.
+    - tt: The TranspositionTable to use. Pass the same table for every move of a game to reuse the results of earlier
+      searches; by default a new table of DEFAULT_TABLE_MB is used.
+    - orderer: The MoveOrderer to use, e.g. with some heuristics turned off to measure them; by default a new one
+      with all of them.
+    - first_depth: The first iteration to run. Helper searches of a parallel search start deeper than the main one so
+      that they fill the shared transposition table ahead of it.
+    - stop_event: An object with an is_set() method, e.g. a multiprocessing.Event; the search stops as soon as it is
+      set, even in the first iteration.
+    - tablebase: A ChessTablebase.Tablebase. Positions it covers are scored exactly instead of searched, so endgames
+      are won by the shortest mate.
+
+    Returns:
+    A SearchResult (move, score, depth, nodes, nps, pv, timeMs). move is None if there are no legal moves; score is
+    in centipawns from the point of view of the player to move.
+    """
+
+    start = time.perf_counter()
+    searcher = Searcher(gs, start + max_time_ms / 1000, max_nodes, tt, orderer, stop_event, tablebase)
+    searcher.tt.new_search()
+    searcher.orderer.new_search()
+    savedState = (gs.checkMate, gs.staleMate, gs.inCheck, gs.checks)
+    result = SearchResult(None, 0, 0, 0, 0, [], 0)
+    for depth in range(min(first_depth, max_depth), max_depth + 1):
+        pv = searcher.rootPv = []
+        score = searcher.negamax(depth, -INFINITY, INFINITY, 0, pv)
+        if searcher.stopped:
+            # Out of time in the first iteration: fall back to the best root move searched so far.
+            if result.move is None and pv:
+                result = SearchResult(pv[0], 0, 0, 0, 0, pv[:1], 0)
+            break
+        elapsed = time.perf_counter() - start
+        result = SearchResult(pv[0] if pv else None, score, depth, searcher.nodes,
+                              int(searcher.nodes / max(elapsed, 1e-9)), pv, int(elapsed * 1000))
+        if callback is not None:
+            callback(result)
+        if not pv or abs(score) >= MATE_THRESHOLD or time.perf_counter() >= searcher.deadline:
+            break
+        searcher.pvMoves = pv
+    gs.checkMate, gs.staleMate, gs.inCheck, gs.checks = savedState
+
+    # Count the nodes of the discarded iteration too, so the speed reflects all the work done.
+    elapsed = time.perf_counter() - start
+    return result._replace(nodes=searcher.nodes, nps=int(searcher.nodes / max(elapsed, 1e-9)),
+                           timeMs=int(elapsed * 1000))
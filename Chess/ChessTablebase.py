@@ -0,0 +1,346 @@
+"""
+Endgame Tablebase Script
+"""
+
+import argparse
+import os
+import sys
+import time
+import zlib
+from array import array
+
+import ChessEngine
+from ChessEngine import MOVE_PROMOTION
+
+# The material sets that can be generated, in dependency order: KPK promotes into KQK and KRK.
+SIGNATURES = ('KQK', 'KRK', 'KPK')
+# The tables each material set needs to be generated.
+DEPENDENCIES = {'KQK': (), 'KRK': (), 'KPK': ('KQK', 'KRK')}
+MAGIC = b'GCTB01'
+FILE_EXTENSION = '.tb'
+# Table values: DRAW, INVALID for impossible positions, otherwise 1 + the plies to mate. The player to move wins if
+# the number of plies is odd and is mated if it is even (0 plies: checkmated now).
+DRAW = 0
+INVALID = 255
+
+# The eight symmetries of the board, as square maps (row * 8 + col). Without pawns any of them can be used; with
+# pawns only the left-right mirror.
+_TRANSFORMS = [[(f(sq >> 3, sq & 7)[0] * 8 + f(sq >> 3, sq & 7)[1]) for sq in range(64)] for f in (
+    lambda r, c: (r, c), lambda r, c: (r, 7 - c), lambda r, c: (7 - r, c), lambda r, c: (7 - r, 7 - c),
+    lambda r, c: (c, r), lambda r, c: (c, 7 - r), lambda r, c: (7 - c, r), lambda r, c: (7 - c, 7 - r))]
+
+
+def _king_squares(pawns):
+    # The squares the White King is moved to by the symmetries: the a1-d1-d4 triangle without pawns, files a-d with.
+    if pawns:
+        return [sq for sq in range(64) if sq & 7 <= 3]
+    return [sq for sq in range(64) if 4 <= sq >> 3 and 7 - (sq >> 3) <= sq & 7 <= 3]
+
+
+def _king_transforms(kingSquares, transforms):
+    # For each White King square, the first symmetry that moves it into kingSquares.
+    return [next(t for t in transforms if t[sq] in kingSquares) for sq in range(64)]
+
+
+class TablebaseTable:
+    """
+    The solved positions of one material set: White King, White piece and Black King, either side to move.
+
+    Attributes:
+    - signature: The material set, e.g. 'KQK'. The stronger side is White; Black is handled by flipping the board.
+    - values: One byte per position (DRAW, INVALID or 1 + plies to mate for the player to move).
+
+    A position is indexed by the symmetry that moves the White King into a canonical area, so that each table only
+    stores an eighth (a half with pawns) of the positions.
+    """
+
+    def __init__(self, signature, values=None):
+        self.signature = signature
+        pawns = signature[1] == 'P'
+        self.kingSquares = _king_squares(pawns)
+        self.kingSlots = {sq: slot for slot, sq in enumerate(self.kingSquares)}
+        self.kingTransforms = _king_transforms(set(self.kingSquares), _TRANSFORMS[:2] if pawns else _TRANSFORMS)
+        self.size = 2 * len(self.kingSquares) * 64 * 64
+        self.values = values if values is not None else bytearray(self.size)
+
+    def index(self, whiteKing, blackKing, piece, whiteToMove):
+        """
+        Get the index of a position with White as the stronger side.
+        """
+
+        transform = self.kingTransforms[whiteKing]
+        return (((0 if whiteToMove else len(self.kingSquares)) + self.kingSlots[transform[whiteKing]]) * 64 +
+                transform[blackKing]) * 64 + transform[piece]
+
+    def value(self, whiteKing, blackKing, piece, whiteToMove):
+        return self.values[self.index(whiteKing, blackKing, piece, whiteToMove)]
+
+    def save(self, path):
+        """
+        Write the table, compressed, to a file.
+
+        Returns:
+        The size of the file in bytes.
+        """
+
+        data = MAGIC + self.signature.encode() + zlib.compress(bytes(self.values), 9)
+        with open(path, 'wb') as file:
+            file.write(data)
+        return len(data)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a table written by save.
+
+        Raises:
+        ValueError if the file is not a table.
+        """
+
+        with open(path, 'rb') as file:
+            data = file.read()
+        header = len(MAGIC) + 3
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a tablebase file: {path}")
+        table = cls(data[len(MAGIC):header].decode())
+        values = bytearray(zlib.decompress(data[header:]))
+        if len(values) != table.size:
+            raise ValueError(f"Corrupt tablebase file: {path}")
+        table.values = values
+        return table
+
+
+def generate(signature, solved=None):
+    """
+    Solve a material set by retrograde analysis.
+
+    Args:
+    - signature: One of SIGNATURES.
+    - solved: Dictionary of the TablebaseTable of each signature solved so far, for the positions a promotion leads to.
+
+    Returns:
+    The solved TablebaseTable.
+
+    Raises:
+    ValueError if a table of DEPENDENCIES[signature] is missing from solved.
+
+    Every position is set up on a GameState and its valid moves are generated by the engine. Positions that are
+    checkmate are lost in 0 plies. Working outward one ply at a time, a position with a move to a lost position is won,
+    and a position whose moves all lead to won positions is lost. Whatever is left is a draw.
+    """
+
+    solved = solved or {}
+    missing = [dependency for dependency in DEPENDENCIES[signature] if dependency not in solved]
+    if missing:
+        raise ValueError(f"{signature} needs the {' and '.join(missing)} tables: generate them first")
+    table = TablebaseTable(signature)
+    values = table.values
+    size = table.size
+    pieceName = 'w' + signature[1]
+    gs = ChessEngine.GameState(fen='k7/8/8/8/8/8/8/K7 w - - 0 1')
+    board = gs.board
+    # The Kings are placed with the piece for each position.
+    board[0][0] = board[7][0] = '--'
+
+    # Children of each position, as position indices, and moves out of the table by the distance they are resolved.
+    childCounts = array('B', bytes(size))
+    edgeChildren = array('I')
+    edgeParents = array('I')
+    external = {}
+
+    def promotion_value(piece, whiteKing, blackKing, square):
+        if piece not in 'QR':
+            return DRAW
+        return solved['K' + piece + 'K'].value(whiteKing, blackKing, square, False)
+
+    squares = range(64)
+    for whiteToMove in (True, False):
+        for whiteKing in table.kingSquares:
+            for blackKing in squares:
+                for piece in squares:
+                    index = table.index(whiteKing, blackKing, piece, whiteToMove)
+                    if whiteKing == blackKing or piece == whiteKing or piece == blackKing or \
+                            (pieceName == 'wP' and piece >> 3 in (0, 7)):
+                        values[index] = INVALID
+                        continue
+                    placed = ((whiteKing, 'wK'), (blackKing, 'bK'), (piece, pieceName))
+                    for sq, name in placed:
+                        board[sq >> 3][sq & 7] = name
+                    gs.sync_piece_squares()
+                    # The player who just moved cannot be in check.
+                    gs.whiteToMove = not whiteToMove
+                    if gs.in_check():
+                        values[index] = INVALID
+                    else:
+                        gs.whiteToMove = whiteToMove
+                        moves = gs.get_valid_moves()
+                        if not moves and gs.inCheck:
+                            values[index] = 1
+                        for move in moves:
+                            code = move.code
+                            start, end = code & 63, (code >> 6) & 63
+                            if (code >> 16) & 15:
+                                # The Black King took the piece: a draw, which never makes the position lost.
+                                childCounts[index] += 1
+                            elif code & MOVE_PROMOTION:
+                                for promoted in 'QRBN':
+                                    childCounts[index] += 1
+                                    value = promotion_value(promoted, whiteKing, blackKing, end)
+                                    if value != DRAW:
+                                        external.setdefault(value - 1, []).append(index)
+                            else:
+                                childCounts[index] += 1
+                                edgeParents.append(index)
+                                edgeChildren.append(table.index(
+                                    end if start == whiteKing else whiteKing, end if start == blackKing else blackKing,
+                                    end if start == piece else piece, not whiteToMove))
+                    for sq, _ in placed:
+                        board[sq >> 3][sq & 7] = '--'
+
+    # Parents of each position, grouped by child (counting sort of the edges).
+    offsets = array('I', bytes(4 * (size + 1)))
+    for child in edgeChildren:
+        offsets[child + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+    parents = array('I', bytes(4 * len(edgeChildren)))
+    fill = offsets[:-1]
+    for child, parent in zip(edgeChildren, edgeParents):
+        parents[fill[child]] = parent
+        fill[child] += 1
+    del edgeChildren, edgeParents, fill
+
+    # Retrograde analysis, one distance at a time.
+    resolved = [i for i in range(size) if values[i] == 1]
+    distance = 0
+    while (resolved or any(d >= distance for d in external)) and distance < INVALID - 2:
+        found = []
+        lost = distance % 2 == 0
+        for parent in [parent for child in resolved for parent in parents[offsets[child]:offsets[child + 1]]] + \
+                external.pop(distance, []):
+            if values[parent]:
+                continue
+            if not lost:
+                childCounts[parent] -= 1
+                if childCounts[parent]:
+                    continue
+            values[parent] = distance + 2
+            found.append(parent)
+        resolved = found
+        distance += 1
+    return table
+
+
+class Tablebase:
+    """
+    The tables found in a directory, probed from live game states.
+
+    Attributes:
+    - tables: Dictionary of the TablebaseTable of each signature.
+    """
+
+    def __init__(self, directory):
+        """
+        Load the tables of a directory.
+
+        Args:
+        - directory: The directory with the SIGNATURE.tb files. Missing tables are skipped.
+        """
+
+        self.tables = {}
+        for signature in SIGNATURES:
+            path = os.path.join(directory, signature + FILE_EXTENSION)
+            if os.path.exists(path):
+                self.tables[signature] = TablebaseTable.load(path)
+
+    def probe(self, gs):
+        """
+        Look up the current position.
+
+        Args:
+        - gs: The game state.
+
+        Returns:
+        None if the position is not covered by a table, otherwise a tuple (result, plies): result is 1 if the player
+        to move wins, -1 if they are mated and 0 for a draw, and plies the number of plies to mate (0 for a draw).
+        """
+
+        pieceSquares = gs.pieceSquares
+        if gs.castlingRights or sum(map(len, pieceSquares.values())) != 3:
+            return None
+        for name, squares in pieceSquares.items():
+            if squares and name[1] != 'K':
+                break
+        else:
+            return None
+        table = self.tables.get('K' + name[1] + 'K')
+        if table is None:
+            return None
+        whiteKing = next(iter(pieceSquares['wK']))
+        blackKing = next(iter(pieceSquares['bK']))
+        piece = next(iter(squares))
+        if name[0] == 'w':
+            value = table.value(whiteKing, blackKing, piece, gs.whiteToMove)
+        else:
+            # Flip the board and the colours so that the stronger side is White.
+            value = table.value(blackKing ^ 56, whiteKing ^ 56, piece ^ 56, not gs.whiteToMove)
+        if value == INVALID:
+            return None
+        if value == DRAW:
+            return 0, 0
+        return (1 if (value - 1) % 2 else -1), value - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Good Chess endgame tablebases")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generateParser = subparsers.add_parser('generate', help="solve material sets and write their tables")
+    generateParser.add_argument('signatures', nargs='*', default=list(SIGNATURES), choices=SIGNATURES)
+    generateParser.add_argument('--output', default='tablebases', help="directory to write the tables to")
+
+    probe = subparsers.add_parser('probe', help="look up a position")
+    probe.add_argument('fen')
+    probe.add_argument('--tables', default='tablebases', help="directory with the tables")
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        os.makedirs(args.output, exist_ok=True)
+        solved = {}
+        # The tables the requested ones depend on are generated too when they are not in the directory yet.
+        wanted = set(args.signatures)
+        for signature in args.signatures:
+            wanted.update(dependency for dependency in DEPENDENCIES[signature]
+                          if not os.path.exists(os.path.join(args.output, dependency + FILE_EXTENSION)))
+        for signature in SIGNATURES:
+            path = os.path.join(args.output, signature + FILE_EXTENSION)
+            if signature not in wanted:
+                if os.path.exists(path):
+                    solved[signature] = TablebaseTable.load(path)
+                continue
+            start = time.perf_counter()
+            table = solved[signature] = generate(signature, solved)
+            elapsed = time.perf_counter() - start
+            fileSize = table.save(path)
+            counts = [0, 0, 0]
+            longest = 0
+            for value in table.values:
+                if value == DRAW:
+                    counts[0] += 1
+                elif value != INVALID:
+                    counts[1 if (value - 1) % 2 else 2] += 1
+                    longest = max(longest, value - 1)
+            print(f"{signature}: {table.size} positions ({counts[1]} won, {counts[2]} lost, {counts[0]} drawn for the "
+                  f"player to move), longest mate {longest} plies, generated in {elapsed:.1f}s, "
+                  f"{fileSize} bytes on disk")
+        sys.exit(0)
+
+    result = Tablebase(args.tables).probe(ChessEngine.GameState.from_fen(args.fen))
+    if result is None:
+        print("Position not in the tablebases")
+    else:
+        print({1: f"Win, mate in {result[1]} plies", -1: f"Loss, mated in {result[1]} plies", 0: "Draw"}[result[0]])
+
+
+if __name__ == "__main__":
+    main()
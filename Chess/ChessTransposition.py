@@ -0,0 +1,176 @@
+"""
+Transposition Table Script
+"""
+
+from array import array
+
+# Bound types of a stored score.
+BOUND_EXACT = 1
+BOUND_LOWER = 2
+BOUND_UPPER = 3
+
+# An entry is two 64-bit words: the data packed as move code (bits 0-25), depth (26-33), bound (34-35), age (36-43)
+# and score + SCORE_OFFSET (44-63), and the Zobrist key XOR the data. Processes sharing the table write the two words
+# without locking, so an entry whose words come from different writes fails the key check instead of being misread.
+ENTRY_BYTES = 16
+SCORE_OFFSET = 1 << 19
+DEPTH_SHIFT = 26
+BOUND_SHIFT = 34
+AGE_SHIFT = 36
+SCORE_SHIFT = 44
+
+
+def table_entries(sizeMb):
+    """
+    Get the number of entries of a table: the largest power of two that fits in the memory budget.
+    """
+
+    return 1 << (max(1, sizeMb * 1024 * 1024 // ENTRY_BYTES).bit_length() - 1)
+
+
+def table_bytes(sizeMb):
+    """
+    Get the size in bytes of the buffer a table of the given memory budget keeps its entries in.
+    """
+
+    return table_entries(sizeMb) * ENTRY_BYTES
+
+
+class TranspositionTable:
+    """
+    A fixed-size hash table of search results, indexed by the position's Zobrist hash.
+
+    Attributes:
+    - size: Number of entries, the largest power of two that fits in the memory budget.
+    - keys: Preallocated array of the Zobrist key XOR the data of each entry.
+    - data: Preallocated array of the packed move, depth, bound, age and score of each entry (0 when empty).
+    - age: Search counter, stored with each entry so that entries from earlier searches are replaced first.
+    - probes, hits, collisions, stores, overwrites: Counters since the last clear or reset_stats.
+
+    Each position maps to one entry. A new result replaces the stored one if the entry is empty, holds the same
+    position, comes from an earlier search, or was searched less deep.
+    """
+
+    def __init__(self, sizeMb=16, buffer=None):
+        """
+        Allocate the table.
+
+        Args:
+        - sizeMb: Memory budget in megabytes.
+        - buffer: Optional writable buffer of at least table_bytes(sizeMb) bytes to keep the entries in, e.g. a
+          multiprocessing.RawArray shared with other processes. By default the table allocates its own arrays.
+        """
+
+        self.size = table_entries(sizeMb)
+        self.mask = self.size - 1
+        if buffer is None:
+            self.keys = array('Q', [0]) * self.size
+            self.data = array('Q', [0]) * self.size
+        else:
+            words = memoryview(buffer).cast('B').cast('Q')
+            self.keys = words[:self.size]
+            self.data = words[self.size:2 * self.size]
+        self.age = 0
+        self.reset_stats()
+
+    def clear(self):
+        """
+        Remove all entries, e.g. when a new game starts.
+        """
+
+        zeros = array('Q', [0]) * self.size
+        self.keys[:] = zeros
+        self.data[:] = zeros
+        self.age = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    def new_search(self):
+        """
+        Start a new search. Entries stored by earlier searches are kept for probing but are replaced first.
+        """
+
+        self.age = (self.age + 1) & 255
+
+    def probe(self, key):
+        """
+        Look up a position.
+
+        Args:
+        - key: The Zobrist hash of the position.
+
+        Returns:
+        A tuple (moveCode, depth, bound, score), or None if the position is not stored.
+        """
+
+        self.probes += 1
+        index = key & self.mask
+        data = self.data[index]
+        if not data:
+            return None
+        if self.keys[index] ^ data != key:
+            self.collisions += 1
+            return None
+        self.hits += 1
+        return (data & 0x3FFFFFF, (data >> DEPTH_SHIFT) & 255, (data >> BOUND_SHIFT) & 3,
+                (data >> SCORE_SHIFT) - SCORE_OFFSET)
+
+    def store(self, key, moveCode, depth, bound, score):
+        """
+        Store the result of searching a position, subject to the replacement policy.
+
+        Args:
+        - key: The Zobrist hash of the position.
+        - moveCode: The code of the best move found, or 0.
+        - depth: The depth the position was searched to.
+        - bound: BOUND_EXACT, BOUND_LOWER (score is at least this) or BOUND_UPPER (score is at most this).
+        - score: The score from the point of view of the player to move.
+        """
+
+        index = key & self.mask
+        data = self.data[index]
+        if data:
+            if self.keys[index] ^ data != key:
+                if ((data >> AGE_SHIFT) & 255) == self.age and ((data >> DEPTH_SHIFT) & 255) > depth:
+                    return
+                self.overwrites += 1
+            elif not moveCode:
+                # Keep the best move of an earlier search of the same position.
+                moveCode = data & 0x3FFFFFF
+        self.stores += 1
+        data = (moveCode | min(depth, 255) << DEPTH_SHIFT | bound << BOUND_SHIFT | self.age << AGE_SHIFT |
+                (score + SCORE_OFFSET) << SCORE_SHIFT)
+        self.keys[index] = key ^ data
+        self.data[index] = data
+
+    def fill(self, sample=1000):
+        """
+        Estimate how full the table is.
+
+        Args:
+        - sample: Number of entries to look at.
+
+        Returns:
+        The fraction of the sampled entries in use.
+        """
+
+        sample = min(sample, self.size)
+        return sum(1 for i in range(sample) if self.data[i]) / sample
+
+    def stats(self):
+        """
+        Get the table's usage statistics.
+
+        Returns:
+        A dictionary with the counters, the hit rate (hits per probe) and the fill fraction.
+        """
+
+        return {'size': self.size, 'probes': self.probes, 'hits': self.hits,
+                'hitRate': self.hits / self.probes if self.probes else 0.0, 'collisions': self.collisions,
+                'stores': self.stores, 'overwrites': self.overwrites, 'fill': self.fill()}
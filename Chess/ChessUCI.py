@@ -0,0 +1,368 @@
+"""
+UCI Engine Script
+
+Runs the engine without a window, speaking the Universal Chess Interface on stdin/stdout so that it can be used from
+chess GUIs and match runners. Only the engine modules are imported: no pygame, tkinter or pypresence.
+"""
+
+import argparse
+import os
+import sys
+import threading
+
+import ChessBook
+import ChessEngine
+import ChessParallel
+import ChessTablebase
+from ChessEngine import MOVE_PROMOTION, PROMOTION_PIECES, START_FEN, Move, expand_promotions
+from ChessSearch import MATE_SCORE, MATE_THRESHOLD
+
+ENGINE_NAME = 'Good Chess'
+ENGINE_AUTHOR = 't0ry003'
+DEFAULT_HASH_MB = 16
+MAX_HASH_MB = 4096
+MAX_THREADS = 64
+# Time budget of a search without a time limit ('go infinite', 'go depth N'); it runs until 'stop' or its depth.
+INFINITE_TIME_MS = 10 ** 9
+# With a clock and no 'movestogo', each move gets the remaining time divided by this.
+DEFAULT_MOVES_TO_GO = 30
+# Kept on the clock for the time it takes to send the move.
+MOVE_OVERHEAD_MS = 50
+
+
+def move_to_uci(move):
+    """
+    Get the UCI notation of a move: the start and end squares, and the promotion piece in lowercase, e.g. 'e7e8q'.
+    """
+
+    text = move.get_chess_notation()
+    if move.code & MOVE_PROMOTION:
+        text += (PROMOTION_PIECES[(move.code >> 23) & 7] or 'Q').lower()
+    return text
+
+
+def parse_uci_move(gs, text, validMoves=None):
+    """
+    Find the valid move a UCI string stands for.
+
+    Args:
+    - gs: The game state the move is played in.
+    - text: The UCI string, e.g. 'e2e4' or 'e7e8q'.
+    - validMoves: The valid moves of the position, if already generated.
+
+    Returns:
+    The Move, with its promotion piece set for promotions.
+
+    Raises:
+    ValueError if the string does not stand for a valid move.
+    """
+
+    if len(text) not in (4, 5) or text[0] not in Move.filesToCols or text[1] not in Move.ranksToRows or \
+            text[2] not in Move.filesToCols or text[3] not in Move.ranksToRows:
+        raise ValueError(f"Invalid move {text!r}")
+    key = (Move.ranksToRows[text[1]] * 8 + Move.filesToCols[text[0]]) | \
+        (Move.ranksToRows[text[3]] * 8 + Move.filesToCols[text[2]]) << 6
+    if validMoves is None:
+        validMoves = gs.get_valid_moves()
+    for move in validMoves:
+        if move.code & 4095 != key:
+            continue
+        if not move.code & MOVE_PROMOTION:
+            if len(text) == 5:
+                break
+            return move
+        promotion = text[4:].upper() or 'Q'
+        if promotion not in PROMOTION_PIECES[1:]:
+            break
+        return Move.from_code(move.code | PROMOTION_PIECES.index(promotion) << 23)
+    raise ValueError(f"Illegal move {text!r} in {gs.to_fen()}")
+
+
+def format_score(score):
+    """
+    Get the UCI score of a search score: 'cp N' in centipawns, or 'mate N' in moves (negative when being mated).
+    """
+
+    if abs(score) < MATE_THRESHOLD:
+        return f"cp {score}"
+    plies = MATE_SCORE - abs(score)
+    return f"mate {(plies + 1) // 2}" if score > 0 else f"mate {-(plies // 2)}"
+
+
+def time_budget(timeLeft, increment=0, movesToGo=None):
+    """
+    Get the time to search for a move from the clock.
+
+    Args:
+    - timeLeft: Time left on the clock of the player to move, in milliseconds.
+    - increment: Time added to the clock after each move, in milliseconds.
+    - movesToGo: Moves until the next time control, or None.
+
+    Returns:
+    The time budget in milliseconds.
+    """
+
+    budget = timeLeft // (movesToGo or DEFAULT_MOVES_TO_GO) + increment * 3 // 4
+    return max(1, min(budget, timeLeft - MOVE_OVERHEAD_MS))
+
+
+class UCIEngine:
+    """
+    The state of a UCI session: options, the position set by the GUI and the search running on it.
+
+    Attributes:
+    - output: The text stream the engine writes to.
+    - gs: The GameState set by the last 'position' command.
+    - options: Dictionary of the option values: Hash (MB), Threads, BookFile and TablebasePath.
+    - searcher: The ChessParallel.ParallelSearcher, created by the first 'go' after an option changes.
+    - book: The ChessBook.OpeningBook, or None.
+    - tablebase: The ChessTablebase.Tablebase, or None.
+    - searchThread: The thread running the current search, or None.
+    - stopEvent: Set by 'stop' to end the current search.
+
+    Commands are handled on the thread reading the input, while searches run on their own thread, so that 'stop' and
+    'isready' are answered during a search.
+    """
+
+    def __init__(self, output=sys.stdout, hashMb=DEFAULT_HASH_MB, threads=1, bookFile='', tablebasePath=''):
+        self.output = output
+        self.outputLock = threading.Lock()
+        self.gs = ChessEngine.GameState()
+        self.options = {'Hash': hashMb, 'Threads': threads, 'BookFile': bookFile, 'TablebasePath': tablebasePath}
+        self.searcher = None
+        self.book = None
+        self.tablebase = None
+        self.searchThread = None
+        self.stopEvent = threading.Event()
+        self.load_book()
+        self.load_tablebase()
+
+    def send(self, line):
+        with self.outputLock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def load_book(self):
+        if self.book is not None:
+            self.book.close()
+            self.book = None
+        path = self.options['BookFile']
+        if path:
+            try:
+                self.book = ChessBook.OpeningBook(path)
+            except (OSError, ValueError) as e:
+                self.send(f"info string Opening book not loaded: {e}")
+
+    def load_tablebase(self):
+        path = self.options['TablebasePath']
+        self.tablebase = None
+        if path:
+            if os.path.isdir(path):
+                self.tablebase = ChessTablebase.Tablebase(path)
+            else:
+                self.send(f"info string Tablebase directory not found: {path}")
+        # The searcher is given the tablebase when it is created.
+        self.close_searcher()
+
+    def close_searcher(self):
+        if self.searcher is not None:
+            self.searcher.close()
+            self.searcher = None
+
+    def handle(self, line):
+        """
+        Handle one command from the GUI.
+
+        Returns:
+        False after 'quit', True otherwise.
+        """
+
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send(f"option name Hash type spin default {DEFAULT_HASH_MB} min 1 max {MAX_HASH_MB}")
+            self.send(f"option name Threads type spin default 1 min 1 max {MAX_THREADS}")
+            self.send("option name BookFile type string default <empty>")
+            self.send("option name TablebasePath type string default <empty>")
+            self.send("uciok")
+        elif command == 'isready':
+            self.send("readyok")
+        elif command == 'setoption':
+            self.wait_search()
+            self.set_option(args)
+        elif command == 'ucinewgame':
+            self.wait_search()
+            if self.searcher is not None:
+                self.searcher.clear()
+        elif command == 'position':
+            self.wait_search()
+            self.set_position(args)
+        elif command == 'go':
+            self.wait_search()
+            self.go(args)
+        elif command == 'stop':
+            self.wait_search()
+        elif command == 'quit':
+            self.wait_search()
+            self.close_searcher()
+            if self.book is not None:
+                self.book.close()
+            return False
+        elif command not in ('debug', 'register', 'ponderhit'):
+            self.send(f"info string Unknown command: {command}")
+        return True
+
+    def set_option(self, args):
+        # setoption name <name> value <value>, where the name and the value may contain spaces.
+        if 'name' not in args:
+            return
+        valueAt = args.index('value') if 'value' in args else len(args)
+        name = ' '.join(args[args.index('name') + 1:valueAt])
+        value = ' '.join(args[valueAt + 1:])
+        if value == '<empty>':
+            value = ''
+        if name in ('Hash', 'Threads'):
+            try:
+                number = int(value)
+            except ValueError:
+                self.send(f"info string Invalid value for {name}: {value!r}")
+                return
+            self.options[name] = max(1, min(number, MAX_HASH_MB if name == 'Hash' else MAX_THREADS))
+            self.close_searcher()
+        elif name == 'BookFile':
+            self.options[name] = value
+            self.load_book()
+        elif name == 'TablebasePath':
+            self.options[name] = value
+            self.load_tablebase()
+        else:
+            self.send(f"info string Unknown option: {name}")
+
+    def set_position(self, args):
+        # position [startpos | fen <FEN>] [moves <move>...]
+        movesAt = args.index('moves') if 'moves' in args else len(args)
+        if args[:1] == ['startpos']:
+            fen = START_FEN
+        elif args[:1] == ['fen']:
+            fen = ' '.join(args[1:movesAt])
+        else:
+            self.send("info string Invalid position command")
+            return
+        try:
+            gs = ChessEngine.GameState(fen=fen)
+            # The side that just moved cannot be left in check: its King could be taken.
+            gs.whiteToMove = not gs.whiteToMove
+            if gs.in_check():
+                raise ValueError(f"the side not to move is in check: {fen!r}")
+            gs.whiteToMove = not gs.whiteToMove
+            validMoves = gs.get_valid_moves()
+            for text in args[movesAt + 1:]:
+                gs.make_move(parse_uci_move(gs, text, validMoves))
+                validMoves = gs.get_valid_moves()
+        except Exception as e:
+            # An inconsistent position must not take the engine down; the previous position is kept.
+            self.send(f"info string Invalid position: {type(e).__name__}: {e}")
+            return
+        self.gs = gs
+
+    def go(self, args):
+        """
+        Start a search of the current position on a new thread, with the limits of a 'go' command: depth, movetime,
+        wtime/btime with winc/binc and movestogo, or infinite. Without a limit the search runs until 'stop'.
+        """
+
+        limits = {}
+        infinite = False
+        i = 0
+        while i < len(args):
+            if args[i] == 'infinite':
+                infinite = True
+            elif args[i] in ('depth', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo') and i + 1 < len(args):
+                try:
+                    limits[args[i]] = int(args[i + 1])
+                except ValueError:
+                    self.send(f"info string Invalid value for {args[i]}: {args[i + 1]!r}")
+                    return
+                i += 1
+            i += 1
+
+        maxTime = INFINITE_TIME_MS
+        clock, increment = ('wtime', 'winc') if self.gs.whiteToMove else ('btime', 'binc')
+        if 'movetime' in limits:
+            maxTime = max(1, limits['movetime'])
+        elif clock in limits:
+            maxTime = time_budget(limits[clock], limits.get(increment, 0), limits.get('movestogo'))
+        # A bare 'go' searches until 'stop', like 'go infinite'.
+        infinite = infinite or not limits
+        maxDepth = max(1, limits.get('depth', 64))
+
+        if self.book is not None and not infinite:
+            move = self.book.choose_move(self.gs)
+            if move is not None:
+                self.send("info string Book move")
+                self.send(f"bestmove {move_to_uci(move)}")
+                return
+        if self.searcher is None:
+            self.searcher = ChessParallel.ParallelSearcher(self.options['Threads'], self.options['Hash'],
+                                                           self.tablebase)
+        self.stopEvent.clear()
+        self.searchThread = threading.Thread(target=self.run_search, args=(maxTime, maxDepth, infinite), daemon=True)
+        self.searchThread.start()
+
+    def run_search(self, maxTime, maxDepth, infinite):
+        gs = self.gs
+        move = None
+        try:
+            result = self.searcher.search(gs, maxTime, maxDepth, callback=self.send_info, stop_event=self.stopEvent)
+            move = result.move
+            if move is None:
+                # Stopped before the first root move was searched: any valid move will do.
+                moves = expand_promotions(gs.get_valid_moves())
+                move = moves[0] if moves else None
+        except Exception as e:
+            # The GUI waits for a best move whatever happens, so the error is reported and 0000 sent.
+            self.send(f"info string Search failed: {type(e).__name__}: {e}")
+        if infinite:
+            # The best move is only sent after 'stop', even if the search ended on its own.
+            self.stopEvent.wait()
+        self.send(f"bestmove {move_to_uci(move) if move is not None else '0000'}")
+
+    def send_info(self, result):
+        self.send(f"info depth {result.depth} score {format_score(result.score)} nodes {result.nodes} "
+                  f"nps {result.nps} time {result.timeMs} pv {' '.join(move_to_uci(move) for move in result.pv)}")
+
+    def wait_search(self):
+        """
+        Stop the current search, if any, and wait for it to send its best move.
+        """
+
+        if self.searchThread is not None:
+            self.stopEvent.set()
+            self.searchThread.join()
+            self.searchThread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Good Chess UCI engine: reads UCI commands on stdin and writes the "
+                                                 "replies on stdout")
+    parser.add_argument('--hash', type=int, default=DEFAULT_HASH_MB, help="transposition table size in MB")
+    parser.add_argument('--threads', type=int, default=1, help="number of search processes")
+    parser.add_argument('--book', default='', help="opening book file")
+    parser.add_argument('--tablebases', default='', help="endgame tablebase directory")
+    args = parser.parse_args()
+
+    engine = UCIEngine(sys.stdout, args.hash, args.threads, args.book, args.tablebases)
+    # Commands are read here while searches run on their own thread.
+    for line in iter(sys.stdin.readline, ''):
+        if not engine.handle(line):
+            break
+    else:
+        engine.handle('quit')
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,19 @@
 # Copyright © 2021 rdbende <rdbende@gmail.com>
 
-source [file join [file dirname [info script]] theme light.tcl]
-source [file join [file dirname [info script]] theme dark.tcl]
+# Each variant loads all of its images, so it is only sourced when set_theme first selects it.
+set ::sun_valley_dir [file join [file dirname [info script]] theme]
+
+proc load_theme {mode} {
+	if {"sun-valley-$mode" ni [ttk::style theme names]} {
+		source [file join $::sun_valley_dir $mode.tcl]
+	}
+}
 
 option add *tearOff 0
 
 proc set_theme {mode} {
 	if {$mode == "dark"} {
+		load_theme dark
 		ttk::style theme use "sun-valley-dark"
 
 		array set colors {
@@ -47,6 +54,7 @@ proc set_theme {mode} {
         option add *Menu.background #2f2f2f
     
 	} elseif {$mode == "light"} {
+		load_theme light
 		ttk::style theme use "sun-valley-light"
 
 		array set colors {
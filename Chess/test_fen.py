@@ -0,0 +1,61 @@
+"""
+FEN Tests
+
+Checks that parse_fen accepts the positions GameState writes and rejects the inconsistent ones. Run from the `Chess`
+directory with `python -m unittest` (or `python -m pytest`).
+"""
+
+import unittest
+
+import ChessEngine
+from ChessPerft import POSITIONS
+
+
+class ParseFenTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        for name, fen, counts in POSITIONS:
+            with self.subTest(position=name):
+                self.assertEqual(ChessEngine.GameState.from_fen(fen).to_fen(), fen)
+
+    def test_double_push_en_passant(self):
+        gs = ChessEngine.GameState()
+        for text in ('e2e4', 'd7d5', 'e4e5', 'f7f5'):
+            move = next(move for move in gs.get_valid_moves() if move.get_chess_notation() == text)
+            gs.make_move(move)
+            fen = gs.to_fen()
+            self.assertEqual(ChessEngine.parse_fen(fen)[3], gs.enpassantPossible, fen)
+        self.assertEqual(ChessEngine.parse_fen(fen)[3], (2, 5))
+
+    def test_invalid_en_passant(self):
+        for fen in (
+                # No pawn was pushed past e3, and it is not Black's move.
+                'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e3 0 1',
+                # The square is on the wrong rank for the side to move.
+                'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e3 0 1',
+                'rnbqkbnr/pppp1ppp/8/4p3/8/8/PPPPPPPP/RNBQKBNR b KQkq e6 0 1',
+                # The pawn in front of the square is missing or the origin square is occupied.
+                'rnbqkbnr/pppppppp/8/8/8/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1',
+                'rnbqkbnr/pppppppp/8/8/4P3/8/PPPPPPPP/RNBQKBN1 b Qkq e3 0 1',
+                # The square itself is occupied.
+                'rnbqkbnr/pppppppp/8/8/4P3/4N3/PPPP1PPP/RNBQKB1R b KQkq e3 0 1',
+                'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e4 0 1',
+                'rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e9 0 1',
+        ):
+            with self.subTest(fen=fen):
+                with self.assertRaises(ValueError):
+                    ChessEngine.parse_fen(fen)
+
+    def test_invalid_kings(self):
+        for fen in ('8/8/8/8/8/8/8/K7 w - - 0 1', 'kk6/8/8/8/8/8/8/K7 w - - 0 1'):
+            with self.subTest(fen=fen):
+                with self.assertRaises(ValueError):
+                    ChessEngine.parse_fen(fen)
+
+    def test_castling_rights_without_pieces(self):
+        castlingRights = ChessEngine.parse_fen('r3k3/8/8/8/8/8/8/4K2R w KQkq - 0 1')[2]
+        self.assertEqual(castlingRights, ChessEngine.FEN_CASTLING['K'] | ChessEngine.FEN_CASTLING['q'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+"""
+Perft Tests
+
+Checks the move generation of GameState against the published perft counts of the reference positions. Run from the
+`Chess` directory with `python -m unittest` (or `python -m pytest`).
+"""
+
+import unittest
+
+import ChessEngine
+import ChessPerft
+from ChessPerft import POSITIONS
+
+# Depths whose node count is above this are left to `python ChessPerft.py`.
+PERFT_MAX_NODES = 100000
+
+
+class PerftTest(unittest.TestCase):
+
+    def test_reference_positions(self):
+        for name, fen, counts in POSITIONS:
+            for depth, expected in enumerate(counts, 1):
+                if expected > PERFT_MAX_NODES:
+                    break
+                with self.subTest(position=name, depth=depth):
+                    gs = ChessEngine.GameState.from_fen(fen)
+                    self.assertEqual(ChessPerft.perft(gs, depth), expected)
+                    # Every move was taken back.
+                    self.assertEqual(gs.to_fen(), fen)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+UCI Tests
+
+Checks the position command of the UCI engine, in particular that invalid positions are reported and ignored. Run from
+the `Chess` directory with `python -m unittest` (or `python -m pytest`).
+"""
+
+import io
+import unittest
+
+import ChessUCI
+
+
+class PositionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output = io.StringIO()
+        self.engine = ChessUCI.UCIEngine(self.output)
+
+    def tearDown(self):
+        self.engine.close_searcher()
+
+    def test_moves(self):
+        self.engine.handle('position startpos moves e2e4 c7c5 g1f3')
+        self.assertEqual(self.engine.gs.to_fen(), 'rnbqkbnr/pp1ppppp/8/2p5/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2')
+        self.assertEqual(self.output.getvalue(), '')
+
+    def test_invalid_positions_are_ignored(self):
+        self.engine.handle('position startpos moves e2e4')
+        fen = self.engine.gs.to_fen()
+        for command in (
+                'position fen rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e3 0 1 moves d2e3',
+                'position fen rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e3 0 1 moves f2e3',
+                'position fen 8/8/8/8/8/8/8/K7 w - - 0 1',
+                'position fen 4k3/8/8/8/8/8/8/4K2r b - - 0 1',
+                'position startpos moves e2e5',
+                'position startpos moves e2e4 e2e4',
+                'position somewhere',
+        ):
+            with self.subTest(command=command):
+                self.output.seek(0)
+                self.output.truncate()
+                self.engine.handle(command)
+                self.assertTrue(self.output.getvalue().startswith('info string Invalid position'))
+                self.assertEqual(self.engine.gs.to_fen(), fen)
+
+    def test_search_after_invalid_position(self):
+        self.engine.handle('position fen rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq e3 0 1 moves d2e3')
+        self.engine.handle('go depth 1')
+        self.engine.wait_search()
+        self.assertIn('bestmove ', self.output.getvalue())
+        self.assertNotIn('bestmove 0000', self.output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()